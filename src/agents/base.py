@@ -1,12 +1,14 @@
 """Base agent class for LangChain-powered agents."""
 
-import json
 from abc import ABC, abstractmethod
+from functools import partial
 
-from langchain_core.messages import HumanMessage, SystemMessage
+import orjson
+from langchain_core.messages import HumanMessage
 
 from src.config import get_settings
-from src.utils.llm_utils import create_agent_executor, get_langchain_llm
+from src.utils.llm_cache import CachedRunnable
+from src.utils.llm_utils import build_system_message, create_agent_executor, get_langchain_llm
 from src.utils.logging import log_llm_call
 
 
@@ -22,7 +24,7 @@ class BaseAgent(ABC):
         self.settings = get_settings()
         self.llm = self._create_llm()
         self.tools = self._get_tools()
-        self.executor = self._create_executor()
+        self.executor = self._create_cached_executor()
 
     @abstractmethod
     def _get_tools(self):
@@ -34,19 +36,60 @@ class BaseAgent(ABC):
         """Return the system prompt for this agent."""
         pass
 
+    @property
+    def model_name(self) -> str:
+        """Return the configured model for this agent."""
+        return getattr(self.settings, f"model_{self.agent_name}", "google/gemini-2.5-pro")
+
+    def _get_prompt_cache_key(self) -> str | None:
+        """Return a provider prompt-cache routing key, or None to let the provider pick."""
+        return None
+
     def _create_llm(self):
         """Create the LangChain LLM for this agent."""
-        model = getattr(self.settings, f"model_{self.agent_name}", "google/gemini-2.5-pro")
-        return get_langchain_llm(model=model, temperature=0.1)
+        return get_langchain_llm(
+            model=self.model_name,
+            temperature=0.1,
+            prompt_cache_key=self._get_prompt_cache_key(),
+        )
+
+    def _get_system_message(self):
+        """Return the system prompt as a (cacheable) SystemMessage."""
+        return build_system_message(self._get_system_prompt(), model=self.model_name)
 
     def _create_executor(self):
         """Create the LangGraph agent executor with tools."""
         return create_agent_executor(
             llm=self.llm,
             tools=self.tools,
-            system_prompt=self._get_system_prompt(),
+            system_prompt=self._get_system_message(),
+        )
+
+    def _create_cached_executor(self):
+        """Wrap the executor so byte-identical requests are answered from the LLM cache."""
+        return CachedRunnable(
+            self._create_executor(),
+            model=self.model_name,
+            namespace=self.agent_name,
+            build_dependent=self._is_build_dependent(),
         )
 
+    def _is_build_dependent(self) -> bool:
+        """Whether cached responses are code, dropped when the run fails to build."""
+        return False
+
+    def _get_cache_context(self, state: dict) -> str:
+        """Return extra state to fold into the LLM cache key. Override in subclasses."""
+        return ""
+
+    def _is_cacheable(self, state: dict, response) -> bool:
+        """Whether a fresh response is worth storing in the LLM cache. Override in subclasses."""
+        return True
+
+    def _bypass_cache(self, state: dict) -> bool:
+        """Whether to skip cached responses and call the LLM. Override in subclasses."""
+        return False
+
     @property
     @abstractmethod
     def agent_name(self) -> str:
@@ -57,10 +100,13 @@ class BaseAgent(ABC):
         """Run the agent with the current workflow state.
 
         Args:
-            state: Current workflow state dict
+            state: Current workflow state dict. Callers pass a private copy
+                (``GraphState.model_dump()``), so agents update it in place. Nested
+                values such as ``state["files"]`` may be shared with other callers
+                and are treated as immutable: agents replace them, never mutate them.
 
         Returns:
-            Updated state dict
+            The same state dict, updated
         """
         # Extract relevant info from state for the agent
         input_text = self._format_state_for_agent(state)
@@ -70,7 +116,10 @@ class BaseAgent(ABC):
         }
 
         try:
-            result = self.executor.invoke({"messages": [{"role": "user", "content": input_text}]})
+            result = await self.executor.ainvoke(
+                {"messages": [{"role": "user", "content": input_text}]},
+                cache_context=self._get_cache_context(state),
+            )
             agent_result = self._format_agent_result(state, result)
 
             log_llm_call(
@@ -91,11 +140,11 @@ class BaseAgent(ABC):
                 success=False,
                 error=str(e),
             )
-            return {
-                **state,
-                "error_message": str(e),
-                "current_step": self.agent_name,
-            }
+            state.update(
+                error_message=str(e),
+                current_step=self.agent_name,
+            )
+            return state
 
     def _format_state_for_agent(self, state: dict) -> str:
         """Format the workflow state for the agent's consumption.
@@ -112,11 +161,11 @@ class BaseAgent(ABC):
         # Extract output from the last assistant message
         output = self._extract_output_from_result(result)
 
-        return {
-            **state,
-            "agent_output": output,
-            "current_step": self._get_next_step(state),
-        }
+        state.update(
+            agent_output=output,
+            current_step=self._get_next_step(state),
+        )
+        return state
 
     def _extract_output_from_result(self, result: dict) -> str:
         """Extract text output from common result formats (LangGraph/Chain)."""
@@ -138,13 +187,13 @@ class BaseAgent(ABC):
                 json_start = output.find("```json") + 7
                 json_end = output.find("```", json_start)
                 json_str = output[json_start:json_end].strip()
-                return json.loads(json_str)
+                return orjson.loads(json_str)
             elif "{" in output and "}" in output:
                 # Direct JSON attempt
                 start = output.find("{")
                 end = output.rfind("}") + 1
-                return json.loads(output[start:end])
-        except (json.JSONDecodeError, ValueError):
+                return orjson.loads(output[start:end])
+        except ValueError:  # includes orjson.JSONDecodeError
             pass
         return {}
 
@@ -203,11 +252,12 @@ class LLMOnlyAgent(BaseAgent):
         }
 
         try:
-            response = self.executor.invoke(
+            response = await self._ainvoke_executor(
                 [
-                    SystemMessage(content=self._get_system_prompt()),
+                    self._get_system_message(),
                     HumanMessage(content=input_text),
-                ]
+                ],
+                state,
             )
 
             # Check if this is structured output (Pydantic model)
@@ -222,7 +272,7 @@ class LLMOnlyAgent(BaseAgent):
 
             log_llm_call(
                 agent_name=self.agent_name,
-                model=self.settings.model_spec_interpreter,
+                model=self.model_name,
                 input_data=input_data,
                 output_data=output_data,
                 success=True,
@@ -233,17 +283,38 @@ class LLMOnlyAgent(BaseAgent):
             output_data = {"error": str(e)}
             log_llm_call(
                 agent_name=self.agent_name,
-                model=self.settings.model_spec_interpreter,
+                model=self.model_name,
                 input_data=input_data,
                 output_data=output_data,
                 success=False,
                 error=str(e),
             )
-            return {
-                **state,
-                "error_message": str(e),
-                "current_step": self.agent_name,
-            }
+            state.update(
+                error_message=str(e),
+                current_step=self.agent_name,
+            )
+            return state
+
+    async def _ainvoke_executor(self, messages: list, state: dict):
+        """Invoke the executor, forwarding streamed items to _on_stream_item."""
+        cache_context = self._get_cache_context(state)
+        cache_if = partial(self._is_cacheable, state)
+        refresh = self._bypass_cache(state)
+        if getattr(self.executor, "streams_items", False):
+            return await self.executor.ainvoke(
+                messages,
+                cache_context=cache_context,
+                cache_if=cache_if,
+                refresh=refresh,
+                on_item=lambda item: self._on_stream_item(state, item),
+            )
+        return await self.executor.ainvoke(
+            messages, cache_context=cache_context, cache_if=cache_if, refresh=refresh
+        )
+
+    def _on_stream_item(self, state: dict, item) -> None:
+        """Handle an item completed while the response streams. Override in subclasses."""
+        pass
 
     def _format_agent_result(self, state: dict, response) -> dict:
         """Format LLM response into workflow state.
@@ -260,8 +331,8 @@ class LLMOnlyAgent(BaseAgent):
 
         Override in subclasses for structured output handling.
         """
-        return {
-            **state,
-            "agent_output": response,
-            "current_step": self._get_next_step(state),
-        }
+        state.update(
+            agent_output=response,
+            current_step=self._get_next_step(state),
+        )
+        return state
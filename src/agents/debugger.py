@@ -1,99 +1,328 @@
 """Debugger Agent - analyzes errors and generates fixes using LangChain."""
 
-from src.agents.base import BaseAgent
-
-SYSTEM_PROMPT = """You are an expert Solana smart contract debugger. Your job is to
-analyze build/validation errors and generate precise fixes.
-
-For each error:
-1. Identify the root cause
-2. Generate minimal, targeted fixes
-3. Ensure fixes don't break other functionality
-
-Output format - return a JSON object with patches to apply:
-
-```json
-{
-    "patches": [
-        {"path": "src/lib.rs", "content": "..."}
-    ],
-    "analysis": "Explanation of what was wrong and how it was fixed"
-}
-```
-
----
-
-ABSOLUTE CONSTRAINTS (VIOLATION = BROKEN OUTPUT):
-
-1. You are FORBIDDEN from:
-   - redefining declare_id!
-   - creating a new declare_id!
-   - modifying programs/*/src/lib.rs outside of adding handler functions inside the existing #[program] module.
-
-2. You must treat programs/*/src/lib.rs as READ-ONLY except for:
-   - inserting instruction handler functions inside the existing #[program] module body.
-
----
-
-COMPILATION TARGET (NON-NEGOTIABLE):
-
-- Rust edition: 2021 ONLY
-- Stable toolchain ONLY (no nightly features)
-- Anchor: 0.30.x
-- Solana toolchain compatible with Anchor 0.30.x
-- Cargo must be compatible with stable Rust 1.75–1.84
-
-You are FORBIDDEN from:
-- using Rust 2024 edition features
-- enabling `edition2024`
-- referencing nightly-only features
-- adding crates that require unstable Cargo features
-
----
-
-COMPILATION SAFETY CHECKLIST (MUST SATISFY ALL):
-
-- Code compiles on stable Rust 2021
-- No nightly features
-- No edition2024
-- No undeclared crates
-- No placeholder imports
-- No unused Anchor features
-- All accounts have correct space calculations
-- All instructions enforce signer + ownership checks
-
-If any fix would require unstable Cargo features, you must find an alternative approach.
-
----
-
-Guidelines:
-- Use relative paths from project root (e.g., "src/lib.rs", "src/instructions/mint.rs")
-- Generate complete file content for patches, not diffs
-- Focus on minimal changes that fix the specific error
-- Preserve existing code where possible
-- Add missing imports/dependencies
-- Fix syntax errors, type mismatches, etc.
-
-The file contents are provided in the prompt below - review them carefully to understand the current code before generating fixes.
-"""
-
-
-class Debugger(BaseAgent):
+import asyncio
+import hashlib
+import logging
+import re
+
+from langchain_core.messages import HumanMessage
+
+from src.agents.base import LLMOnlyAgent
+from src.agents.prompts import load_prompt
+from src.schemas.models import DebuggerOutput, DebuggerPatch, ProjectFile
+from src.utils.llm_cache import CachedRunnable
+from src.utils.llm_utils import TokenBudget, build_system_message
+from src.utils.unified_diff import PatchError, apply_unified_diff
+
+logger = logging.getLogger(__name__)
+
+# File references in errors: rustc's "programs/x/src/foo.rs:42:10" or the validator's "path: msg".
+# Matches only start at a path boundary, so long non-path tokens in big logs are scanned once.
+_ERROR_LOCATION = re.compile(
+    r"(?<![\w./-])(?P<path>[\w./-]+\.(?:rs|ts|toml))(?::(?P<line>\d+)(?::(?P<column>\d+))?)?"
+)
+
+# Lines of context shown around each referenced error line
+ERROR_CONTEXT_LINES = 20
+
+# Lines shown for files that no error refers to
+SIGNATURE_LINES = 10
+
+# Token budget for the file context sent with each debug request
+CONTEXT_TOKEN_BUDGET = 8000
+
+# Concurrent LLM calls when independent per-file errors are debugged in parallel
+MAX_PARALLEL_FIXES = 4
+
+# Start of a diagnostic in cargo output, and cargo's closing summary lines
+_DIAGNOSTIC_START = re.compile(r"^(?=(?:error|warning)\b)", re.MULTILINE)
+_BUILD_SUMMARY = re.compile(r"^error: (?:could not compile|aborting due to)")
+
+# Crate-local imports, e.g. "use crate::accounts::Counter;" -> "accounts"
+_CRATE_IMPORT = re.compile(r"\buse\s+crate::(\w+)")
+
+
+def _resolve_path(ref: str, files: dict[str, str]) -> str | None:
+    """Match a path from an error message to a project file (rustc may print it absolute)."""
+    return next((p for p in files if ref == p or ref.endswith(f"/{p}")), None)
+
+
+def _find_error_locations(files: dict[str, str], error_text: str) -> dict[str, set[int]]:
+    """Map each file referenced in the errors to the line numbers mentioned.
+
+    An empty set means the file is named without a line, so it is sent whole.
+    """
+    locations: dict[str, set[int]] = {}
+    for match in _ERROR_LOCATION.finditer(error_text):
+        path = _resolve_path(match["path"], files)
+        if path is None:
+            continue
+        lines = locations.setdefault(path, set())
+        if match["line"]:
+            lines.add(int(match["line"]))
+    return locations
+
+
+def _format_region(
+    path: str, content: str, lines: set[int] | None = None, head: int | None = None
+) -> str:
+    """Render line-numbered excerpts of a file.
+
+    Args:
+        path: File path for the header
+        content: File contents
+        lines: Error lines to show with surrounding context
+        head: Number of lines to show from the top; the whole file if neither is given
+    """
+    source = content.splitlines()
+    if not source:
+        return f"\n=== {path} (empty) ===\n"
+
+    if lines:
+        ranges = []
+        for line in sorted(lines):
+            start = max(0, line - ERROR_CONTEXT_LINES - 1)
+            end = min(len(source), line + ERROR_CONTEXT_LINES)
+            if ranges and start <= ranges[-1][1]:
+                ranges[-1][1] = max(ranges[-1][1], end)
+            else:
+                ranges.append([start, end])
+    else:
+        ranges = [[0, len(source) if head is None else min(len(source), head)]]
+
+    blocks = [
+        "\n".join(f"{n + 1:4} | {source[n]}" for n in range(start, end)) for start, end in ranges
+    ]
+    shown = ", ".join(f"{start + 1}-{end}" for start, end in ranges)
+    return f"\n=== {path} (lines {shown} of {len(source)}) ===\n" + "\n   ...\n".join(blocks)
+
+
+def _format_files_context(files: dict[str, str], error_text: str) -> str:
+    """Select the file context for the prompt: errored regions first, within budget."""
+    locations = _find_error_locations(files, error_text)
+    unreferenced = [path for path in files if path not in locations]
+
+    # Manifests and the program entrypoint header are always relevant
+    sections = [
+        _format_region(path, files[path]) for path in unreferenced if path.endswith("Cargo.toml")
+    ]
+    sections += [
+        _format_region(path, files[path], head=ERROR_CONTEXT_LINES)
+        for path in unreferenced
+        if path.endswith("src/lib.rs")
+    ]
+    # Files named without a line number (e.g. mismatched braces) are sent whole
+    sections += [_format_region(path, files[path], lines) for path, lines in locations.items()]
+    sections += [
+        _format_region(path, files[path], head=SIGNATURE_LINES)
+        for path in unreferenced
+        if not path.endswith(("Cargo.toml", "src/lib.rs"))
+    ]
+
+    budget = TokenBudget(CONTEXT_TOKEN_BUDGET)
+    included = [section for section in sections if budget.add(section)]
+    omitted = len(sections) - len(included)
+    if omitted:
+        included.append(f"\n({omitted} more file sections omitted to fit the context budget)")
+    return "".join(included)
+
+
+class Debugger(LLMOnlyAgent):
     """Agent that debugs and fixes contract code using LangChain."""
 
+    def __init__(self):
+        """Initialize the debugger and its full-file fallback executor."""
+        super().__init__()
+        self.regenerator = CachedRunnable(
+            self.llm.with_structured_output(ProjectFile),
+            model=self.model_name,
+            namespace=f"{self.agent_name}_regenerate",
+            build_dependent=True,
+        )
+
     @property
     def agent_name(self):
         return "debugger"
 
-    def _get_tools(self):
-        """No tools needed - file contents are passed in the state."""
-        return []
+    def _create_executor(self):
+        """Create structured LLM returning diff patches."""
+        return self.llm.with_structured_output(DebuggerOutput)
 
     def _get_system_prompt(self):
-        return SYSTEM_PROMPT
+        return load_prompt("debugger")
+
+    async def run(self, state: dict) -> dict:
+        """Apply diff patches, regenerating whole files only for diffs that fail to apply."""
+        # The state is updated in place, so capture the errors before they are cleared
+        errors = self._format_errors(state)
+        result = await super().run(state)
+        failed = result.pop("debugger_failed_patches", [])
+        if not failed:
+            return result
+
+        regenerated = await asyncio.gather(
+            *(self._regenerate_file(result, errors, patch) for patch in failed),
+            return_exceptions=True,
+        )
+        for patch, file in zip(failed, regenerated, strict=True):
+            if isinstance(file, Exception):
+                logger.warning("[Debugger] Could not regenerate %s: %s", patch.path, file)
+            else:
+                result["files"][patch.path] = file.content
+        return result
+
+    async def _ainvoke_executor(self, messages: list, state: dict):
+        """Debug independent per-file errors in parallel, otherwise in a single call."""
+        partitions = self._partition_errors_by_file(state)
+        if not partitions or len(partitions) < 2 or not self._are_independent(state, partitions):
+            return await super()._ainvoke_executor(messages, state)
+
+        logger.info("[Debugger] Fixing %s independent files in parallel", len(partitions))
+        semaphore = asyncio.Semaphore(MAX_PARALLEL_FIXES)
+        invoke = super()._ainvoke_executor
+
+        async def fix_file(path: str, errors: list[str]) -> DebuggerOutput:
+            focused = self._focus_state(state, path, errors)
+            prompt = self._format_state_for_agent(focused)
+            async with semaphore:
+                return await invoke(
+                    [self._get_system_message(), HumanMessage(content=prompt)], focused
+                )
+
+        outputs = await asyncio.gather(
+            *(fix_file(path, errors) for path, errors in partitions.items())
+        )
+        return DebuggerOutput(
+            patches=[patch for output in outputs for patch in output.patches],
+            analysis="\n".join(
+                f"{path}: {output.analysis}"
+                for path, output in zip(partitions, outputs, strict=True)
+            ),
+        )
+
+    def _partition_errors_by_file(self, state: dict) -> dict[str, list[str]] | None:
+        """Group error messages by the one file each refers to.
+
+        Returns None when any error can't be pinned to exactly one file (e.g. a
+        general agent error or a diagnostic spanning files), since those need
+        the whole picture in a single call.
+        """
+        if state.get("error_message"):
+            return None
 
-    def _format_state_for_agent(self, state: dict) -> str:
-        """Format the error info for the agent."""
+        files = state.get("files", {})
+        build_logs = state.get("build_logs") or ""
+        # Keep errors only; warnings and the "Compiling ..." preamble are noise here
+        diagnostics = [
+            chunk.rstrip()
+            for chunk in _DIAGNOSTIC_START.split(build_logs)
+            if chunk.startswith("error")
+        ]
+        if build_logs and not diagnostics:
+            # Build output without rustc diagnostics can't be split up
+            return None
+
+        partitions: dict[str, list[str]] = {}
+        for error in [*state.get("validation_errors", []), *diagnostics]:
+            paths = {
+                path
+                for match in _ERROR_LOCATION.finditer(error)
+                if (path := _resolve_path(match["path"], files))
+            }
+            if len(paths) == 1:
+                partitions.setdefault(paths.pop(), []).append(error)
+            elif paths or not _BUILD_SUMMARY.match(error):
+                return None
+        return partitions
+
+    def _crate_imports(self, state: dict, path: str) -> set[str]:
+        """Return the project files a file pulls in with ``use crate::<module>``."""
+        files = state.get("files", {})
+        src_dir = path[: path.rfind("/src/") + 5] if "/src/" in path else ""
+        modules = set(_CRATE_IMPORT.findall(files.get(path, "")))
+        return {
+            other
+            for other in files
+            if other != path
+            and any(
+                other in (f"{src_dir}{m}.rs", f"{src_dir}{m}/mod.rs")
+                or other.startswith(f"{src_dir}{m}/")
+                for m in modules
+            )
+        }
+
+    def _are_independent(self, state: dict, partitions: dict[str, list[str]]) -> bool:
+        """Check that no errored file imports another errored file."""
+        errored = set(partitions)
+        return all(not (self._crate_imports(state, path) & errored) for path in errored)
+
+    def _focus_state(self, state: dict, path: str, errors: list[str]) -> dict:
+        """Build a state holding only one file's errors, the file and its direct imports."""
+        keep = {path} | self._crate_imports(state, path)
+        files = {
+            p: content
+            for p, content in state.get("files", {}).items()
+            if p in keep or p.endswith(("Cargo.toml", "src/lib.rs"))
+        }
+        validation_errors = set(state.get("validation_errors", []))
+        diagnostics = [e for e in errors if e not in validation_errors]
+        return {
+            **state,
+            "files": files,
+            "validation_errors": [e for e in errors if e in validation_errors],
+            "build_logs": "\n".join(diagnostics) or None,
+        }
+
+    async def _regenerate_file(self, state: dict, errors: str, patch: DebuggerPatch) -> ProjectFile:
+        """Ask for the complete content of a single file whose diff didn't apply."""
+        logger.info("[Debugger] Diff for %s did not apply, regenerating file", patch.path)
+        current = state.get("files", {}).get(patch.path, "")
+        prompt = f"""Errors:
+{errors}
+
+Current content of {patch.path}:
+{current}
+
+Intended fix ({patch.reason or "no reason given"}), as a diff that failed to apply:
+{patch.unified_diff}
+
+Return the complete corrected content of {patch.path}."""
+        return await self.regenerator.ainvoke(
+            [
+                build_system_message(load_prompt("debugger_regenerate"), model=self.model_name),
+                HumanMessage(content=prompt),
+            ],
+            cache_context=self._get_cache_context(state),
+        )
+
+    def _is_build_dependent(self) -> bool:
+        return True
+
+    def _is_cacheable(self, state: dict, response: DebuggerOutput) -> bool:
+        """Cache a fix only if at least one of its patches applies to the files it was made for."""
+        files = state.get("files", {})
+        for patch in response.patches:
+            try:
+                apply_unified_diff(files.get(patch.path, ""), patch.unified_diff)
+            except PatchError:
+                continue
+            return True
+        return False
+
+    def _get_cache_context(self, state: dict) -> str:
+        """Key cached fixes on the exact file contents they were produced for."""
+        files = state.get("files", {})
+        return "\n".join(
+            f"{path}:{hashlib.sha256(content.encode()).hexdigest()}"
+            for path, content in sorted(files.items())
+        )
+
+    def _error_text(self, state: dict) -> str:
+        """Join the raw validation errors and build logs for file reference lookup."""
+        return "\n".join([*state.get("validation_errors", []), state.get("build_logs") or ""])
+
+    def _format_errors(self, state: dict) -> str:
+        """Collect validation, build and agent errors from the state."""
         error_info = ""
 
         if state.get("validation_errors"):
@@ -105,56 +334,53 @@ class Debugger(BaseAgent):
 
         if not error_info:
             error_info = "Unknown error - no error information available"
+        return error_info
 
-        files = state.get("files", {})
-
-        # Include file contents so the agent can see the code
-        files_content = ""
-        for path, content in files.items():
-            files_content += f"\n=== {path} ===\n{content}"
+    def _format_state_for_agent(self, state: dict) -> str:
+        """Format the error info and the relevant file regions for the agent."""
+        error_info = self._format_errors(state)
+        files_content = _format_files_context(state.get("files", {}), self._error_text(state))
 
         return f"""Analyze and fix these errors:
 
 {error_info}
 
-Current project files with contents:
+Relevant project files (line-numbered excerpts; line numbers are not part of the file):
 {files_content}
 
-Use the file reading tools to examine the code if needed. Return patches to fix the issues as a JSON object."""
-
-    def _format_agent_result(self, state: dict, result: dict) -> dict:
-        """Extract patches and return them in state."""
-        output = self._extract_output_from_result(result)
-        data = self._extract_json_from_output(output)
+Return unified diff patches that fix the issues as a JSON object."""
 
-        # Extract analysis for logging
-        analysis = data.get("analysis", "No analysis provided")
-
-        # Try 'patches' key first, then fallback to general file map
-        patches = data.get("patches", [])
-        if not patches and "files" in data:
-            patches = [{"path": p, "content": c} for p, c in data["files"].items()]
+    def _format_agent_result(self, state: dict, response: DebuggerOutput) -> dict:
+        """Apply diff patches to the current files and return them in state."""
+        analysis = response.analysis or "No analysis provided"
+        patches = response.patches
 
         if patches:
-            updated_files = state.get("files", {}.copy())
+            # Copy, never patch state["files"]: it is shared with the caller's dump
+            updated_files = dict(state.get("files", {}))
+            failed_patches = []
             for patch in patches:
-                path = patch.get("path")
-                content = patch.get("content")
-                if path and content:
-                    updated_files[path] = content
-
-            return {
-                **state,
-                "files": updated_files,
-                "debugger_analysis": analysis,
-                "debugger_patches_count": len(patches),
-                "error_message": None,
-                "current_step": "static_validator",
-            }
-
-        return {
-            **state,
-            "debugger_analysis": analysis,
-            "current_step": "abort",
-            "error_message": f"Debugger failed: {output}",
-        }
+                try:
+                    updated_files[patch.path] = apply_unified_diff(
+                        updated_files.get(patch.path, ""), patch.unified_diff
+                    )
+                except PatchError as e:
+                    logger.warning("[Debugger] Patch for %s failed: %s", patch.path, e)
+                    failed_patches.append(patch)
+
+            state.update(
+                files=updated_files,
+                debugger_analysis=analysis,
+                debugger_patches_count=len(patches),
+                debugger_failed_patches=failed_patches,
+                error_message=None,
+                current_step="static_validator",
+            )
+            return state
+
+        state.update(
+            debugger_analysis=analysis,
+            current_step="abort",
+            error_message=f"Debugger failed: {analysis}",
+        )
+        return state
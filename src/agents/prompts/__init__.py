@@ -0,0 +1,10 @@
+"""System prompts for the agents, stored as Markdown resources."""
+
+import functools
+from importlib import resources
+
+
+@functools.cache
+def load_prompt(name: str) -> str:
+    """Load an agent prompt by name, reading the file only on first use."""
+    return resources.files(__name__).joinpath(f"{name}.md").read_text(encoding="utf-8")
@@ -1,50 +1,148 @@
 """Spec Interpreter Agent - converts natural language to structured TokenSpec using LangChain."""
 
-import json
+import hashlib
+import logging
 import re
+from collections import OrderedDict
+from functools import lru_cache
+
+from langchain_core.messages import AIMessage
 
 from src.agents.base import LLMOnlyAgent
 from src.schemas.models import TokenSpec
+from src.utils.llm_cache import llm_cache_enabled
+
+logger = logging.getLogger(__name__)
 
 SYSTEM_PROMPT = """You are a Solana smart contract specification interpreter.
-Your job is to convert ANY natural language specification into a structured TokenSpec.
-
-You support ALL types of Solana programs:
-- Token contracts (mintable, burnable, transferable, etc.)
-- Counter programs (increment, decrement, reset)
-- Escrow contracts (deposit, withdraw, cancel)
-- Staking programs (stake, unstake, claim rewards)
-- Vault programs (deposit, withdraw, split)
-- Custom programs with any instructions
-
-For the specification, determine:
-1. What is the program NAME?
-2. What INSTRUCTIONS are needed (e.g., initialize, mint, transfer, increment, deposit)?
-3. What ACCOUNTS are required (e.g., counter, mint, token_account, user)?
-4. What DATA STRUCTURES are needed (custom account state)?
-5. What FEATURES apply (mintable, burnable, counter, escrow, etc.)?
-
-Output format: JSON only, no markdown, matching this schema:
-{
-    "name": "Program Name",
-    "symbol": "SYM or null (only for tokens)",
-    "description": "Brief description of what this program does",
-    "decimals": 9 or null (only for tokens)",
-    "features": ["mintable", "counter", "escrow", ...],
-    "initial_supply": null or number (only for tokens)",
-    "instructions": ["initialize", "increment", "decrement", ...],
-    "accounts": ["counter", "authority", "user", ...],
-    "data_structs": [{"name": "Counter", "fields": [{"name": "count", "type": "u64"}, {"name": "authority", "type": "pubkey"}]}]
-}
+Convert the natural language specification in the user message into a structured TokenSpec.
+Any Solana program is supported: tokens, counters, escrows, staking, vaults or custom programs.
+
+Determine the program name, the instructions it needs, the accounts they use, any custom
+account state (data_structs) and the features that apply.
+
+Output JSON only, no markdown. Set symbol, decimals and initial_supply only for tokens:
+{"name": "Program Name", "symbol": "SYM", "description": "What the program does", "decimals": 9,
+"features": ["mintable"], "initial_supply": 1000000, "instructions": ["initialize", "mint"],
+"accounts": ["mint", "authority"],
+"data_structs": [{"name": "Counter", "fields": [{"name": "count", "type": "u64"}]}]}
 
 Examples:
-- "create a counter program" -> instructions: ["initialize", "increment"], accounts: ["counter", "authority"], data_structs: Counter with count field
-- "create a mintable token" -> instructions: ["initialize", "mint", "transfer"], features: ["mintable", "transferable"], accounts: ["mint", "token_account"]
-- "create an escrow contract" -> instructions: ["initialize", "deposit", "withdraw", "cancel"], features: ["escrow"], accounts: ["escrow", " initializer", "temp_token_account"]
+- counter: instructions [initialize, increment], accounts [counter, authority], Counter{count}
+- mintable token: instructions [initialize, mint, transfer], features [mintable, transferable]
+- escrow: instructions [initialize, deposit, withdraw, cancel], accounts [escrow, initializer]
 
-Infer missing information from the specification. Default to simple, secure implementations.
+Infer anything missing. Default to simple, secure implementations.
 """
 
+# Encoded once at import for anything that needs the prompt as bytes (hashing, byte counts)
+_SYSTEM_PROMPT_BYTES = SYSTEM_PROMPT.encode("utf-8")
+
+# Derived from the prompt so the routing key changes exactly when the cached prefix does
+PROMPT_CACHE_KEY = f"spec_interpreter_{hashlib.sha256(_SYSTEM_PROMPT_BYTES).hexdigest()[:8]}"
+
+RESPONSE_CACHE_SIZE = 512
+
+# Longer specs are rejected before they can overflow the context window
+MAX_SPEC_LENGTH = 8192
+
+# Runs of characters that aren't valid in a project name
+_NAME_SANITIZE = re.compile(r"[^a-z0-9]+")
+_WHITESPACE = re.compile(r"\s+")
+# A response wrapped in a ```json (or bare ```) markdown fence
+_FENCE = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL)
+
+# Cleaned JSON responses keyed on model, prompt hash and normalized spec, most recent last
+_response_cache: OrderedDict[str, str] = OrderedDict()
+
+
+@lru_cache(maxsize=RESPONSE_CACHE_SIZE)
+def _normalize_spec(user_spec: str) -> str:
+    """Lowercase and collapse whitespace, so near-identical specs compare equal."""
+    return _WHITESPACE.sub(" ", user_spec.strip().lower())
+
+
+def _response_cache_key(model: str, user_spec: str) -> str:
+    """Key a spec on its normalized text, the model and the prompt version."""
+    return f"{model}:{PROMPT_CACHE_KEY}:{_normalize_spec(user_spec)}"
+
+
+# Ready-made interpretations of the prompt's example specs, answered without an LLM call
+_CANONICAL_SPECS: dict[str, TokenSpec] = {
+    "create a counter program": TokenSpec(
+        name="Counter",
+        description="A counter that its authority can increment",
+        features=["counter"],
+        instructions=["initialize", "increment"],
+        accounts=["counter", "authority"],
+        data_structs=[
+            {
+                "name": "Counter",
+                "fields": [
+                    {"name": "count", "type": "u64"},
+                    {"name": "authority", "type": "pubkey"},
+                ],
+            }
+        ],
+    ),
+    "create a mintable token": TokenSpec(
+        name="Mintable Token",
+        symbol="MINT",
+        description="An SPL token whose authority can mint new supply",
+        decimals=9,
+        features=["mintable", "transferable"],
+        initial_supply=0,
+        instructions=["initialize", "mint", "transfer"],
+        accounts=["mint", "token_account", "authority"],
+    ),
+    "create an escrow contract": TokenSpec(
+        name="Escrow",
+        description="Holds deposited tokens until the trade is completed or cancelled",
+        features=["escrow"],
+        instructions=["initialize", "deposit", "withdraw", "cancel"],
+        accounts=["escrow", "initializer", "temp_token_account"],
+        data_structs=[
+            {
+                "name": "Escrow",
+                "fields": [
+                    {"name": "initializer", "type": "pubkey"},
+                    {"name": "temp_token_account", "type": "pubkey"},
+                    {"name": "amount", "type": "u64"},
+                ],
+            }
+        ],
+    ),
+}
+
+
+# TokenSpec's compiled core validator, called directly rather than through model_validate
+_TOKEN_SPEC_VALIDATOR = TokenSpec.__pydantic_validator__
+
+
+def _parse_token_spec_json(payload: str) -> TokenSpec:
+    """Decode and validate a JSON response into a TokenSpec in one pass.
+
+    pydantic parses the JSON itself, so no intermediate dict is built; a
+    non-object payload or missing required field fails inside the same call.
+
+    Raises:
+        ValueError: If payload isn't valid JSON or fails validation
+    """
+    return _TOKEN_SPEC_VALIDATOR.validate_json(payload)
+
+
+def _strip_fences(response: str) -> str:
+    """Remove a markdown fence around a JSON response, if there is one.
+
+    Each path makes a single copy of the payload: the fence pattern skips the
+    surrounding whitespace itself, so the response isn't stripped first.
+    """
+    if "```" in response:
+        match = _FENCE.match(response)
+        if match:
+            return match.group(1)
+    return response.strip()
+
 
 class SpecInterpreter(LLMOnlyAgent):
     """Agent that interprets natural language specifications using LangChain."""
@@ -55,12 +153,29 @@ class SpecInterpreter(LLMOnlyAgent):
         Args:
             test_mode: If True, use mock LLM for testing
         """
-        super().__init__()
         self.test_mode = test_mode
-        if test_mode:
+        super().__init__()
+
+    @property
+    def model_name(self) -> str:
+        # Keep mock responses apart from real ones in the LLM cache
+        if self.test_mode:
+            return "mock-spec-interpreter"
+        return super().model_name
+
+    def _create_executor(self):
+        """Stream the raw JSON response, stopping as soon as the object is complete."""
+        from src.utils.llm_utils import JsonTextStream
+
+        return JsonTextStream(self.llm)
+
+    def _create_llm(self):
+        """Use the mock LLM in test mode so the executor is built on it."""
+        if self.test_mode:
             from src.utils.llm_utils import MockLLM
 
-            self.llm = MockLLM(model="mock-spec-interpreter")
+            return MockLLM(model=self.model_name)
+        return super()._create_llm()
 
     @property
     def agent_name(self) -> str:
@@ -69,41 +184,84 @@ class SpecInterpreter(LLMOnlyAgent):
     def _get_system_prompt(self) -> str:
         return SYSTEM_PROMPT
 
-    def _format_state_for_agent(self, state: dict) -> str:
-        """Extract user spec from state for the agent."""
+    def _get_prompt_cache_key(self) -> str | None:
+        return PROMPT_CACHE_KEY
+
+    async def run(self, state: dict) -> dict:
+        """Reject empty or oversized specs without an LLM call, then interpret."""
         user_spec = state.get("user_spec", "")
-        if not user_spec:
-            return "Error: No user specification provided"
-        return f"Interpret this specification:\n\n{user_spec}"
+        if not user_spec.strip():
+            error = "No user specification provided"
+        elif len(user_spec) > MAX_SPEC_LENGTH:
+            error = f"Specification too long ({len(user_spec)} > {MAX_SPEC_LENGTH} characters)"
+        else:
+            canonical = _CANONICAL_SPECS.get(_normalize_spec(user_spec))
+            if canonical is not None:
+                return self._apply_token_spec(state, canonical)
+            return await super().run(state)
+
+        state.update(error_message=error, current_step="spec_interpreter")
+        return state
+
+    def _apply_token_spec(self, state: dict, token_spec: TokenSpec) -> dict:
+        """Store the interpreted spec and derive project_name from its name."""
+        name = _NAME_SANITIZE.sub("_", token_spec.name.lower()).strip("_")[:32]
+        if not name:
+            name = "solana_contract"
+
+        state.update(
+            interpreted_spec=token_spec.model_dump(exclude_none=True),
+            project_name=name,
+            current_step="project_planner",
+        )
+        return state
+
+    async def _ainvoke_executor(self, messages: list, state: dict):
+        """Answer repeated specs from the in-process response cache without an LLM call."""
+        if not llm_cache_enabled():
+            return await super()._ainvoke_executor(messages, state)
+
+        key = _response_cache_key(self.model_name, state.get("user_spec", ""))
+        cached = _response_cache.get(key)
+        if cached is not None:
+            _response_cache.move_to_end(key)
+            return AIMessage(content=cached)
+        return await super()._ainvoke_executor(messages, state)
+
+    def _is_cacheable(self, state: dict, response: AIMessage) -> bool:
+        """Cache a response only if it parses into a valid TokenSpec."""
+        try:
+            _parse_token_spec_json(_strip_fences(response.content))
+        except ValueError:  # includes pydantic.ValidationError
+            return False
+        return True
+
+    def _remember_response(self, state: dict, response: str) -> None:
+        """Store a response that parsed into a valid TokenSpec, evicting the oldest entry."""
+        if not llm_cache_enabled():
+            return
+        _response_cache[_response_cache_key(self.model_name, state.get("user_spec", ""))] = response
+        if len(_response_cache) > RESPONSE_CACHE_SIZE:
+            _response_cache.popitem(last=False)
+
+    def _format_state_for_agent(self, state: dict) -> str:
+        """Extract user spec from state for the agent.
+
+        The instructions live in the system prompt, so the user message is just the
+        spec and everything before it stays byte-identical across requests.
+        """
+        return state.get("user_spec", "")
 
     def _extract_state_from_response(self, state: dict, response: str) -> dict:
         """Parse the LLM response and extract TokenSpec."""
         try:
-            # Clean up response if it has markdown formatting
-            clean_response = response.strip()
-            if clean_response.startswith("```json"):
-                clean_response = clean_response[7:]
-            if clean_response.endswith("```"):
-                clean_response = clean_response[:-3]
-            clean_response = clean_response.strip()
-
-            data = json.loads(clean_response)
-            token_spec = TokenSpec(**data)
-
-            # Generate project_name from token name
-            name = re.sub(r"[^a-z0-9]+", "_", token_spec.name.lower()).strip("_")[:32]
-            if not name:
-                name = "solana_contract"
-
-            return {
-                **state,
-                "interpreted_spec": token_spec.model_dump(),
-                "project_name": name,
-                "current_step": "project_planner",
-            }
-        except (json.JSONDecodeError, ValueError) as e:
-            return {
-                **state,
-                "error_message": f"Failed to parse spec interpretation: {e}\nRaw: {response}",
-                "current_step": "spec_interpreter",
-            }
+            clean_response = _strip_fences(response)
+            token_spec = _parse_token_spec_json(clean_response)
+            self._remember_response(state, clean_response)
+            return self._apply_token_spec(state, token_spec)
+        except ValueError as e:  # includes pydantic.ValidationError
+            state.update(
+                error_message=f"Failed to parse spec interpretation: {e}\nRaw: {response}",
+                current_step="spec_interpreter",
+            )
+            return state
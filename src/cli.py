@@ -120,6 +120,10 @@ def _on_event(event: str) -> None:
         path = event.split(":", 2)[2]
         console.print(f"    [dim]→[/dim] [cyan]Creating[/cyan] [white]{path}[/white]")
 
+    elif event.startswith("build:log:"):
+        # Compiler output may contain [brackets], so print it without markup
+        console.print(event[len("build:log:") :], style="dim", markup=False, highlight=False)
+
     elif event.startswith("batch:planned:"):
         parts = event.split(":", 3)
         batch_id = parts[2]
@@ -136,10 +140,18 @@ def _on_event(event: str) -> None:
         batch_id = event.split(":", 2)[2]
         console.print(f"  [green]✓[/green] Batch complete: [cyan]{batch_id}[/cyan]")
 
+    elif event.startswith("batch:failed:"):
+        batch_id = event.split(":", 2)[2]
+        console.print(f"  [red]✗[/red] Batch failed, will retry: [cyan]{batch_id}[/cyan]")
+
     elif event.startswith("file:generating:"):
         path = event.split(":", 2)[2]
         console.print(f"    [dim]→[/dim] [yellow]Generating[/yellow] [white]{path}[/white]")
 
+    elif event.startswith("file:streamed:"):
+        path = event.split(":")[2]
+        console.print(f"    [dim]→ Received[/dim] [white]{path}[/white]")
+
     elif event.startswith("file:created:"):
         parts = event.split(":", 3)
         path = parts[2]
@@ -365,7 +377,7 @@ def _display_results(state: GraphState, output: Path, verbose: bool) -> None:
 
     if verbose and state.build_logs:
         console.print("\n[bold yellow]Build Logs:[/bold yellow]")
-        console.print(state.build_logs)
+        console.print(state.build_logs_full or state.build_logs)
 
 
 @app.command()
@@ -33,6 +33,12 @@ class Settings:
 
     # Build Configuration
     anchor_sbf_root: str | None = field(default=None)
+    # Start anchor build while static validation runs instead of after it passes
+    speculative_build: bool = field(default=False)
+
+    # Generation Configuration
+    # Generate all ready batches of a plan step in one LLM call instead of one call each
+    coalesce_batches: bool = field(default=False)
 
 
 def _load_config_from_yaml() -> dict:
@@ -50,6 +56,7 @@ def _merge_settings(yaml_config: dict) -> Settings:
     # Parse models section
     models = yaml_config.get("models", {})
     build = yaml_config.get("build", {})
+    generation = yaml_config.get("generation", {})
 
     return Settings(
         openrouter_api_key=getenv("OPENROUTER_API_KEY"),
@@ -59,6 +66,8 @@ def _merge_settings(yaml_config: dict) -> Settings:
         model_code_generator=models.get("code_generator", defaults.model_code_generator),
         model_debugger=models.get("debugger", defaults.model_debugger),
         anchor_sbf_root=build.get("anchor_sbf_root", defaults.anchor_sbf_root),
+        speculative_build=build.get("speculative_build", defaults.speculative_build),
+        coalesce_batches=generation.get("coalesce_batches", defaults.coalesce_batches),
     )
 
 
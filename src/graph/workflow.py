@@ -1,32 +1,74 @@
 """LangGraph workflow for orchestrating contract generation pipeline."""
 
+import asyncio
+import functools
+import hashlib
 import logging
+import os
+import re
 from collections.abc import Callable
 from pathlib import Path
 from typing import Any
 
-from langgraph.graph import END, StateGraph
+from langgraph.graph import END, START, StateGraph
 
 from src.agents.code_generator import CodeGenerator
 from src.agents.debugger import Debugger
 from src.agents.file_planner import FilePlanner
 from src.agents.project_planner import ProjectPlanner
 from src.agents.spec_interpreter import SpecInterpreter
-from src.schemas.models import MAX_RETRIES, GraphState
+from src.config import get_settings
+from src.schemas.models import MAX_BATCH_ATTEMPTS, MAX_RETRIES, GraphState, TokenSpec
 from src.utils.builder import Builder
+from src.utils.event_queue import EventQueue
 from src.utils.file_ops import FileOps
+from src.utils.llm_cache import get_llm_cache, track_build_dependent
 from src.validators.static_validator import StaticValidator
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Upper bound on concurrent CodeGenerator calls within one generation step,
+# to stay clear of provider rate limits
+MAX_PARALLEL_BATCHES = 8
 
-def _preserve_declare_id(project_root: Path, new_content: str) -> str:
-    """Preserve existing declare_id! when writing lib.rs.
+# Lines of a failed build's output kept in build_logs for the debugger
+BUILD_LOG_MAX_LINES = 200
 
-    If lib.rs already exists with a valid declare_id!, replace the generated
-    declare_id! line with the existing one to preserve the program ID from anchor init.
+# Start of a diagnostic in cargo output
+_DIAGNOSTIC_START = re.compile(r"^(?=(?:error|warning)\b)", re.M)
+
+# Program ID declarations in lib.rs; every one is replaced by the anchor init line
+_DECLARE_ID = re.compile(r"^[ \t]*declare_id!.*$", re.M)
+
+# declare_id! line from anchor init's lib.rs, per project root
+_declare_id_lines: dict[Path, str] = {}
+
+
+def _extract_diagnostics(output: str, max_lines: int = BUILD_LOG_MAX_LINES) -> str:
+    """Trim build output to its error diagnostics, or to its last lines if it has none.
+
+    Failed cargo builds are mostly "Compiling ..." progress and repeated
+    warnings; the debugger only needs the error blocks, with their --> locations.
     """
+    lines = output.splitlines()
+    if len(lines) <= max_lines:
+        return output
+    errors = [
+        chunk.rstrip() for chunk in _DIAGNOSTIC_START.split(output) if chunk.startswith("error")
+    ]
+    kept = "\n".join(errors).splitlines() if errors else lines[-max_lines:]
+    return "\n".join(kept[:max_lines])
+
+
+def _lookup_declare_id(project_root: Path) -> str | None:
+    """Find the declare_id! line of the project's lib.rs, reading it only once per project.
+
+    Missing results aren't cached, so a later anchor init is still picked up.
+    """
+    if project_root in _declare_id_lines:
+        return _declare_id_lines[project_root]
+
     lib_path = project_root / "programs" / "*" / "src" / "lib.rs"
     # Try to find the actual lib.rs path
     programs_dir = project_root / "programs"
@@ -36,33 +78,34 @@ def _preserve_declare_id(project_root: Path, new_content: str) -> str:
                 lib_path = child / "src" / "lib.rs"
                 break
 
-    if not lib_path.exists():
-        return new_content
-
-    # Read existing file to get declare_id
     try:
-        existing_content = lib_path.read_text()
-        # Find the declare_id line
-        for line in existing_content.split("\n"):
-            if line.strip().startswith("declare_id!"):
-                # Replace declare_id in new content with existing one
-                lines = new_content.split("\n")
-                new_lines = []
-                for l in lines:
-                    if l.strip().startswith("declare_id!"):
-                        new_lines.append(line)
-                    else:
-                        new_lines.append(l)
-                return "\n".join(new_lines)
-    except Exception:
-        pass
-
-    return new_content
+        match = _DECLARE_ID.search(lib_path.read_text())
+    except OSError:
+        return None
+    if not match:
+        return None
+    _declare_id_lines[project_root] = match.group()
+    return match.group()
+
+
+def _preserve_declare_id(project_root: Path, new_content: str) -> str:
+    """Preserve existing declare_id! when writing lib.rs.
+
+    If lib.rs already exists with a valid declare_id!, replace the generated
+    declare_id! line with the existing one to preserve the program ID from anchor init.
+    """
+    declare_line = _lookup_declare_id(project_root)
+    if declare_line is None:
+        return new_content
+    return _DECLARE_ID.sub(lambda _: declare_line, new_content)
 
 
 def create_workflow(test_mode: bool = False) -> StateGraph:
     """Create the LangGraph workflow.
 
+    Building the graph has no side effects, so run_workflow compiles it once
+    per configuration and reuses it.
+
     Args:
         test_mode: If True, use mock LLM for testing
 
@@ -73,6 +116,7 @@ def create_workflow(test_mode: bool = False) -> StateGraph:
 
     # Define nodes
     workflow.add_node("spec_interpreter", spec_interpreter_node)
+    workflow.add_node("anchor_init", anchor_init_node)
     workflow.add_node("project_planner", project_planner_node)
     workflow.add_node("file_planner", file_planner_node)
     workflow.add_node("batch_processor", batch_processor_node)
@@ -81,9 +125,11 @@ def create_workflow(test_mode: bool = False) -> StateGraph:
     workflow.add_node("debugger", debugger_node)
     workflow.add_node("abort", abort_node)
 
-    # Define edges - linear flow
-    workflow.set_entry_point("spec_interpreter")
-    workflow.add_edge("spec_interpreter", "project_planner")
+    # Define edges
+    # anchor init doesn't depend on the spec, so it runs alongside the Spec Interpreter
+    workflow.add_edge(START, "spec_interpreter")
+    workflow.add_edge(START, "anchor_init")
+    workflow.add_edge(["spec_interpreter", "anchor_init"], "project_planner")
     workflow.add_edge("project_planner", "file_planner")
     workflow.add_edge("file_planner", "batch_processor")
 
@@ -94,6 +140,7 @@ def create_workflow(test_mode: bool = False) -> StateGraph:
         {
             "continue": "batch_processor",
             "done": "static_validator",
+            "abort": "abort",
         },
     )
 
@@ -119,12 +166,26 @@ def create_workflow(test_mode: bool = False) -> StateGraph:
         },
     )
 
-    # Edge from debugger - after fix, go directly to build (skip static validation)
-    workflow.add_edge("debugger", "build_contract")
+    # Edge from debugger - after a fix, go directly to build (skip static validation)
+    workflow.add_conditional_edges(
+        "debugger",
+        should_build_after_debugger,
+        {
+            "build": "build_contract",
+            "abort": "abort",
+        },
+    )
+    workflow.add_edge("abort", END)
 
     return workflow
 
 
+@functools.lru_cache(maxsize=4)
+def _compiled_app(test_mode: bool):
+    """Compile the workflow once per configuration; create_workflow has no side effects."""
+    return create_workflow(test_mode=test_mode).compile()
+
+
 def should_proceed_to_build(state: GraphState) -> str:
     """Determine if we should proceed to build or go to debugger."""
     if state.validation_passed:
@@ -145,30 +206,35 @@ def should_proceed_to_end(state: GraphState) -> str:
         return "abort"
 
 
+def should_build_after_debugger(state: GraphState) -> str:
+    """Rebuild only if the debugger changed files; unchanged code would fail the same way."""
+    return "build" if state.fix_attempted and not state.error_message else "abort"
+
+
 def has_more_batches(state: GraphState) -> str:
     """Determine if there are more batches to process.
 
-    Returns 'continue' if we should process more batches, 'done' if finished.
+    Returns 'continue' if we should process more batches, 'done' if finished,
+    'abort' if a batch failed MAX_BATCH_ATTEMPTS times.
     In legacy mode (generation_plan is None), always returns 'done'.
     """
     # Legacy mode - skip batch processing
     if not state.generation_plan:
         return "done"
 
-    # Check if there are pending files to process
-    if state.pending_files and len(state.pending_files) > 0:
+    if state.work_remaining:
         return "continue"
-    return "done"
+    return "abort" if _exhausted_batches(state.batch_attempts) else "done"
 
 
-def _safe_merge(state: GraphState, agent_result: dict[str, Any]) -> dict[str, Any]:
-    """Safely merge agent result with state, excluding control fields.
+def _exhausted_batches(batch_attempts: dict[str, int]) -> list[str]:
+    """Return the ids of batches that have used up their generation attempts."""
+    return [batch_id for batch_id, count in batch_attempts.items() if count >= MAX_BATCH_ATTEMPTS]
 
-    Control fields (user_spec, retry_count, project_root, current_step, etc.)
-    must NEVER come from agents to prevent LLM from corrupting workflow state.
-    These fields are excluded from BOTH sources to prevent duplicate keyword errors.
-    """
-    control_fields = {
+
+# Fields that must NEVER come from agents, to prevent the LLM from corrupting workflow state
+_CONTROL_FIELDS = frozenset(
+    {
         "user_spec",
         "project_name",
         "retry_count",
@@ -179,71 +245,125 @@ def _safe_merge(state: GraphState, agent_result: dict[str, Any]) -> dict[str, An
         "final_artifact",
         "on_event",
         "test_mode",
+        "work_remaining",
+        "batch_attempts",
+        "speculative_build",
     }
+)
+
 
-    # Build merged dict excluding control fields from BOTH sources
-    merged = {}
-    for key, value in state.model_dump().items():
-        if key not in control_fields:
-            merged[key] = value
-    for key, value in agent_result.items():
-        if key not in control_fields:
-            merged[key] = value
+# GraphState fields an agent's result may update
+_AGENT_FIELDS = frozenset(GraphState.model_fields) - _CONTROL_FIELDS
 
-    return merged
 
+def _agent_updates(agent_result: dict[str, Any]) -> dict[str, Any]:
+    """Pick the fields of an agent's result that may update the graph state.
+
+    Control fields (user_spec, retry_count, project_root, current_step, etc.)
+    must NEVER come from agents to prevent LLM from corrupting workflow state.
+    Keys that aren't GraphState fields (agent bookkeeping) are dropped too.
+    The result is meant for ``state.model_copy(update=...)``, which keeps every
+    other field of the already validated state.
+    """
+    return {k: v for k, v in agent_result.items() if k in _AGENT_FIELDS}
+
+
+@functools.lru_cache(maxsize=8)
+def _project_path(project_root: str) -> Path:
+    """Return the Path for a project root, built once per workflow run."""
+    return Path(project_root)
+
+
+@functools.lru_cache(maxsize=8)
+def _file_ops(project_root: str) -> FileOps:
+    """Return the shared FileOps for a project root, so its base path is resolved once."""
+    return FileOps(_project_path(project_root))
+
+
+@functools.lru_cache(maxsize=8)
+def _builder(project_root: str) -> Builder:
+    """Return the shared Builder for a project root, used by validation and build."""
+    return Builder(_project_path(project_root))
+
+
+@functools.cache
+def _get_agent(agent_class: type, **kwargs):
+    """Return the shared agent instance for agent_class and its init kwargs.
+
+    Agents keep no per-run state (each run works on the state dict it is
+    given), so one instance, with its LLM client and executor, serves every
+    batch and retry.
+    """
+    return agent_class(**kwargs)
 
-async def _run_agent_node(state: GraphState, agent_class: type, agent_name: str) -> GraphState:
-    """Shared helper to run an agent node with logging and event handling."""
+
+async def _run_agent_node(state: GraphState, agent, agent_name: str) -> dict[str, Any]:
+    """Shared helper to run an agent node with logging and event handling.
+
+    Returns only the non-control fields the agent changed, so the node can run
+    in a parallel branch without writing channels owned by its sibling.
+    """
     if state.on_event:
         state.on_event(f"agent:{agent_name}:start")
 
-    logger.info(f"[{agent_name}] Starting...")
+    logger.info("[%s] Starting...", agent_name)
     try:
-        # Check if agent class accepts test_mode
-        # (only SpecInterpreter currently does explicitly in __init__)
-        if agent_name == "Spec Interpreter":
-            agent = agent_class(test_mode=state.test_mode)
-        else:
-            agent = agent_class()
-
-        result_state = await agent.run(state.model_dump())
-        logger.info(f"[{agent_name}] Completed successfully")
+        state_dump = state.model_dump()
+        # Agents update the dict in place, so keep the original values to diff against
+        original = dict(state_dump)
+        result_state = await agent.run(state_dump)
+        logger.info("[%s] Completed successfully", agent_name)
 
         if state.on_event:
             state.on_event(f"agent:{agent_name}:end")
 
-        # Merge non-control fields
-        merged = _safe_merge(state, result_state)
-
-        # Increment retry count if this is the debugger
-        new_retry_count = state.retry_count + (1 if agent_name == "Debugger" else 0)
-
-        return GraphState(
-            **merged,
-            user_spec=state.user_spec,
-            retry_count=new_retry_count,
-            project_root=state.project_root or result_state.get("project_root"),
-            on_event=state.on_event,
-            test_mode=state.test_mode,
-        )
+        return {
+            k: v for k, v in result_state.items() if k in _AGENT_FIELDS and original.get(k) is not v
+        }
     except Exception as e:
-        logger.error(f"[{agent_name}] FAILED: {e}")
+        logger.error("[%s] FAILED: %s", agent_name, e)
         if state.on_event:
             state.on_event(f"agent:{agent_name}:failed")
         raise
 
 
-async def spec_interpreter_node(state: GraphState) -> GraphState:
-    return await _run_agent_node(state, SpecInterpreter, "Spec Interpreter")
+async def spec_interpreter_node(state: GraphState) -> dict[str, Any]:
+    agent = _get_agent(SpecInterpreter, test_mode=state.test_mode)
+    return await _run_agent_node(state, agent, "Spec Interpreter")
 
 
-async def project_planner_node(state: GraphState) -> GraphState:
-    """Run project planner agent and handle file writing."""
-    if state.on_event:
-        state.on_event("agent:Project Planner:start")
+# Written after a successful anchor init: digest of the Anchor.toml it generated
+INIT_MARKER = ".ail_init_hash"
 
-    logger.info("[Project Planner] Starting...")
+
+def _anchor_toml_digest(project_root: Path) -> str:
+    return hashlib.sha256((project_root / "Anchor.toml").read_bytes()).hexdigest()
+
+
+def _is_initialized(project_root: Path, project_name: str) -> bool:
+    """Check whether an earlier anchor init left this project intact, so it can be skipped.
+
+    Set SMART_CONTRACT_FORCE_INIT=1 to always run anchor init.
+    """
+    if os.environ.get("SMART_CONTRACT_FORCE_INIT") == "1":
+        return False
+    try:
+        marker = (project_root / INIT_MARKER).read_text()
+        return (
+            marker == _anchor_toml_digest(project_root)
+            and (project_root / "programs" / project_name).is_dir()
+        )
+    except OSError:
+        return False
+
+
+async def anchor_init_node(state: GraphState) -> dict[str, Any]:
+    """Run anchor init for the project, in parallel with the Spec Interpreter.
+
+    Only project_name and project_root are returned, so the update doesn't
+    collide with the Spec Interpreter's fields when both branches join.
+    """
+    logger.info("[Anchor Init] Starting...")
     try:
         # Get project name from state (provided by CLI)
         project_name = state.project_name
@@ -258,46 +378,65 @@ async def project_planner_node(state: GraphState) -> GraphState:
         project_root = contracts_dir / project_name
         builder = Builder(contracts_dir)
 
-        logger.info(f"[Project Planner] Running anchor init {project_name}...")
-        success, output = builder.anchor_init(project_name)
+        if _is_initialized(project_root, project_name):
+            logger.info("[Anchor Init] %s already initialized, skipping anchor init", project_name)
+        else:
+            logger.info("[Anchor Init] Running anchor init %s...", project_name)
+            success, output = await asyncio.to_thread(builder.anchor_init, project_name)
+            # anchor init may have generated a new program ID
+            _declare_id_lines.pop(project_root, None)
+
+            if success:
+                try:
+                    (project_root / INIT_MARKER).write_text(_anchor_toml_digest(project_root))
+                except OSError as e:
+                    logger.debug("[Anchor Init] Could not write init marker: %s", e)
+            else:
+                logger.warning("[Anchor Init] anchor init failed: %s", output)
+                # Continue anyway - maybe the directory already exists
+
+        return {"project_name": project_name, "project_root": str(project_root)}
+    except Exception as e:
+        logger.error("[Anchor Init] FAILED: %s", e)
+        raise
 
-        if not success:
-            logger.warning(f"[Project Planner] anchor init failed: {output}")
-            # Continue anyway - maybe the directory already exists
 
-        # Now run the ProjectPlanner agent
-        agent = ProjectPlanner()
-        result_state = await agent.run(state.model_dump())
+async def project_planner_node(state: GraphState) -> GraphState:
+    """Run project planner agent and handle file writing."""
+    if state.on_event:
+        state.on_event("agent:Project Planner:start")
+
+    logger.info("[Project Planner] Starting...")
+    try:
+        # Set by anchor_init_node
+        project_name = state.project_name
+        project_root = state.project_root
+
+        # Run the ProjectPlanner agent
+        agent = _get_agent(ProjectPlanner)
+        state_dump = state.model_dump()
+        result_state = await agent.run(state_dump)
 
         # Write program files
         files = result_state.get("files", {})
         if files:
-            file_ops = FileOps(project_root)
+            file_ops = _file_ops(project_root)
 
-            for path, _content in files.items():
-                if state.on_event:
+            if state.on_event:
+                for path in files:
                     state.on_event(f"file:write:{project_name}/{path}")
 
-            file_ops.write_files(files)
-            logger.info(f"[Project Planner] Wrote {len(files)} program files")
+            await file_ops.awrite_files(files)
+            logger.info("[Project Planner] Wrote %s program files", len(files))
 
-        logger.info(f"[Project Planner] Completed: {project_name}")
+        logger.info("[Project Planner] Completed: %s", project_name)
 
         if state.on_event:
             state.on_event("agent:Project Planner:end")
 
-        merged = _safe_merge(state, result_state)
-        return GraphState(
-            **merged,
-            user_spec=state.user_spec,
-            retry_count=state.retry_count,
-            project_name=project_name,
-            project_root=str(project_root),
-            on_event=state.on_event,
-            test_mode=state.test_mode,
-        )
+        return state.model_copy(update=_agent_updates(result_state))
     except Exception as e:
-        logger.error(f"[Project Planner] FAILED: {e}")
+        logger.error("[Project Planner] FAILED: %s", e)
         raise
 
 
@@ -308,32 +447,32 @@ async def file_planner_node(state: GraphState) -> GraphState:
 
     logger.info("[File Planner] Starting...")
     try:
-        agent = FilePlanner()
-        result_state = await agent.run(state.model_dump())
+        agent = _get_agent(FilePlanner)
+        state_dump = state.model_dump()
+        result_state = await agent.run(state_dump)
 
         # Get the generation plan (may be a Pydantic model or dict)
-        import sys
-
         plan_dict = result_state.get("generation_plan")
-        print(f"[FilePlanner DEBUG] plan_dict type: {type(plan_dict)}", file=sys.stderr)
+        logger.debug("[File Planner] plan_dict type: %s", type(plan_dict))
 
         # Convert Pydantic model to dict if needed
         if plan_dict and hasattr(plan_dict, "model_dump"):
             plan_dict = plan_dict.model_dump()
-            print(f"[FilePlanner DEBUG] Converted to dict: {plan_dict}", file=sys.stderr)
+            logger.debug("[File Planner] Converted to dict: %s", plan_dict)
 
         if plan_dict and isinstance(plan_dict, dict) and plan_dict.get("batches"):
-            # Initialize pending files tracking
-            all_files = set()
+            # Initialize pending files tracking (empty content placeholders, in plan order)
             batches = plan_dict["batches"]
+            all_files = []
             for batch in batches:
-                all_files.update(batch.get("file_paths", []))
-
-            # Calculate total files
-            total_files = sum(len(batch.get("file_paths", [])) for batch in batches)
+                all_files.extend(batch.get("file_paths", ()))
+            pending_files = dict.fromkeys(all_files, "")
+            total_files = len(pending_files)
 
             logger.info(
-                f"[File Planner] Created plan with {len(batches)} batches, {total_files} files total"
+                "[File Planner] Created plan with %s batches, %s files total",
+                len(batches),
+                total_files,
             )
 
             if state.on_event:
@@ -343,55 +482,100 @@ async def file_planner_node(state: GraphState) -> GraphState:
                     )
                 state.on_event("agent:File Planner:end")
 
-            merged = _safe_merge(state, result_state)
-            # Remove incremental tracking fields from merged to avoid duplicate kwargs
-            merged.pop("generation_plan", None)
-            merged.pop("pending_files", None)
-            merged.pop("generated_files", None)
-            merged.pop("file_progress", None)
-            return GraphState(
-                **merged,
-                user_spec=state.user_spec,
-                retry_count=state.retry_count,
-                project_root=state.project_root,
-                on_event=state.on_event,
-                test_mode=state.test_mode,
-                # Initialize incremental tracking
+            update = _agent_updates(result_state)
+            # Initialize incremental tracking
+            update.update(
                 generation_plan=plan_dict,  # Already a dict
-                pending_files={f: "" for f in all_files},  # Empty content placeholders
+                pending_files=pending_files,
                 generated_files={},
                 file_progress=(0, total_files),
             )
+            return state.model_copy(update=update)
         else:
             # Fallback: no plan generated, use legacy behavior
             logger.warning("[File Planner] No plan generated, falling back to legacy mode")
             if state.on_event:
                 state.on_event("agent:File Planner:end")
-            merged = _safe_merge(state, result_state)
-            # Remove generation_plan from merged to avoid duplicate kwarg
-            merged.pop("generation_plan", None)
-            merged.pop("pending_files", None)
-            merged.pop("generated_files", None)
-            merged.pop("file_progress", None)
-            return GraphState(
-                **merged,
-                user_spec=state.user_spec,
-                retry_count=state.retry_count,
-                project_root=state.project_root,
-                on_event=state.on_event,
-                test_mode=state.test_mode,
+            update = _agent_updates(result_state)
+            update.update(
                 generation_plan=None,  # Will trigger legacy behavior
+                pending_files={},
+                generated_files={},
+                file_progress=(0, 0),
             )
+            return state.model_copy(update=update)
 
     except Exception as e:
-        logger.error(f"[File Planner] FAILED: {e}")
+        logger.error("[File Planner] FAILED: %s", e)
         if state.on_event:
             state.on_event("agent:File Planner:failed")
         raise
 
 
+def _coalesce_batches(batches: list[dict]) -> dict:
+    """Merge sibling batches into one, so a plan step is generated in a single LLM call."""
+    return {
+        "batch_id": "+".join(batch.get("batch_id", "") for batch in batches),
+        "file_paths": [path for batch in batches for path in batch.get("file_paths", [])],
+        "description": "; ".join(
+            f"{batch.get('batch_id')}: {batch.get('description', '')}" for batch in batches
+        ),
+        "dependencies": sorted({dep for batch in batches for dep in batch.get("dependencies", [])}),
+    }
+
+
+def _find_ready_batches(plan: dict, completed: set[str], pending: set[str]) -> list[dict]:
+    """Return every batch of the first generation step that can run now.
+
+    A batch is ready when all files of its dependency batches are generated
+    and it still has pending files. Batches in the same step are independent,
+    so the returned list can be generated concurrently.
+    """
+    # Index once per call so each lookup below is a dict hit, not a scan of all batches.
+    # The index isn't kept in generation_plan, which must stay plain serializable data.
+    batches_by_id = {b.get("batch_id"): b for b in plan.get("batches", [])}
+    for step in plan.get("generation_order", []):
+        ready = []
+        for batch_id in step:
+            batch = batches_by_id.get(batch_id)
+            if not batch:
+                continue
+
+            # All files in every dependency batch must be generated
+            deps_satisfied = all(
+                completed.issuperset(batches_by_id[dep_id].get("file_paths", []))
+                for dep_id in batch.get("dependencies", [])
+                if dep_id in batches_by_id
+            )
+
+            # Check if this batch has pending files
+            has_pending = not pending.isdisjoint(batch.get("file_paths", []))
+
+            if deps_satisfied and has_pending:
+                ready.append(batch)
+        if ready:
+            return ready
+    return []
+
+
+async def _write_generated_files(state: GraphState, files: dict[str, str]) -> None:
+    """Write generated files to the project in one batch, then emit their events."""
+    root = _project_path(state.project_root)
+    # Preserve declare_id when writing lib.rs
+    files = {
+        path: _preserve_declare_id(root, content)
+        if path == "lib.rs" or path.endswith("/lib.rs")
+        else content
+        for path, content in files.items()
+    }
+    await _file_ops(state.project_root).awrite_files(files)
+    if state.on_event:
+        for path, content in files.items():
+            state.on_event(f"file:created:{path}:{len(content)}")
+
+
 async def batch_processor_node(state: GraphState) -> GraphState:
-    """Process the next batch of files to generate.
+    """Process the next step of ready batches, generating them concurrently.
 
     If no generation plan exists, falls back to legacy code generator behavior.
     """
@@ -406,123 +590,159 @@ async def batch_processor_node(state: GraphState) -> GraphState:
     logger.info("[Code Generator] Starting batch processing...")
 
     try:
-        plan = plan_dict
-        batches = plan.get("batches", [])
         completed = set(state.generated_files.keys())
         pending = set(state.pending_files.keys())
 
-        # Find next ready batch (all dependencies satisfied)
-        batch_to_process = None
-        generation_order = plan.get("generation_order", [])
-        for step in generation_order:
-            for batch_id in step:
-                batch = next((b for b in batches if b.get("batch_id") == batch_id), None)
-                if not batch:
-                    continue
-
-                # Check if all dependencies are satisfied
-                deps_satisfied = True
-                for dep_id in batch.get("dependencies", []):
-                    dep_batch = next((b for b in batches if b.get("batch_id") == dep_id), None)
-                    if dep_batch:
-                        # Check if all files in dependency batch are generated
-                        for dep_file in dep_batch.get("file_paths", []):
-                            if dep_file not in completed:
-                                deps_satisfied = False
-                                break
-                    if not deps_satisfied:
-                        break
-
-                # Check if this batch has pending files
-                has_pending = any(f in pending for f in batch.get("file_paths", []))
-
-                if deps_satisfied and has_pending:
-                    batch_to_process = batch
-                    break
-            if batch_to_process:
-                break
+        ready_batches = _find_ready_batches(plan_dict, completed, pending)
 
-        if not batch_to_process:
+        if not ready_batches:
             # All batches processed - move to validation
             logger.info("[Code Generator] All batches complete")
             if state.on_event:
                 state.on_event("agent:Code Generator:end")
 
-            return GraphState(
-                **state.model_dump(),
-                pending_files={},
-                user_spec=state.user_spec,
-                retry_count=state.retry_count,
-                project_root=state.project_root,
-                on_event=state.on_event,
-                test_mode=state.test_mode,
-            )
-
-        # Process the batch
-        if state.on_event:
-            state.on_event(f"batch:start:{batch_to_process.get('batch_id')}")
-            for path in batch_to_process.get("file_paths", []):
-                if path in pending:
-                    state.on_event(f"file:generating:{path}")
-
-        # Run code generator for this batch
-        batch_state = {
-            **state.model_dump(),
-            "current_batch": batch_to_process,
-        }
+            return state.model_copy(update={"pending_files": {}, "work_remaining": False})
 
-        agent = CodeGenerator()
-        result_state = await agent.run(batch_state)
+        # Attempts are counted per plan batch, even when a step is generated as one call
+        plan_batches = ready_batches
+        coalesced = get_settings().coalesce_batches and len(ready_batches) > 1
+        if coalesced:
+            ready_batches = [_coalesce_batches(ready_batches)]
 
-        # Get generated files - filter to only include files from current batch
-        all_new_files = result_state.get("files", {})
-        batch_files = batch_to_process.get("file_paths", [])
-        new_files = {
-            path: content for path, content in all_new_files.items() if path in batch_files
-        }
+        state_dump = state.model_dump()
+        semaphore = asyncio.Semaphore(MAX_PARALLEL_BATCHES)
 
-        # Write files to disk and emit events
-        if new_files and state.project_root:
-            file_ops = FileOps(Path(state.project_root))
-            for path, content in new_files.items():
-                # Preserve declare_id when writing lib.rs
-                if "lib.rs" in path and state.project_root:
-                    content = _preserve_declare_id(Path(state.project_root), content)
-                file_ops.write_file(path, content)
+        async def process_batch(batch: dict) -> tuple[dict, dict[str, str]]:
+            """Generate one batch and write its files to disk."""
+            async with semaphore:
                 if state.on_event:
-                    state.on_event(f"file:created:{path}:{len(content)}")
+                    state.on_event(f"batch:start:{batch.get('batch_id')}")
+                    for path in batch.get("file_paths", []):
+                        if path in pending:
+                            state.on_event(f"file:generating:{path}")
+
+                # A batch that failed before is regenerated rather than replayed from the cache
+                members = plan_batches if coalesced else [batch]
+                attempt = max(state.batch_attempts.get(b.get("batch_id"), 0) for b in members)
+                agent = _get_agent(CodeGenerator)
+                result_state = await agent.run(
+                    {**state_dump, "current_batch": {**batch, "attempt": attempt}}
+                )
+
+            # Get generated files - filter to only include files from this batch.
+            # "files" holds the whole project, so look up the batch's few paths in it
+            all_new_files = result_state.get("files", {})
+            new_files = {
+                path: all_new_files[path]
+                for path in batch.get("file_paths", ())
+                if path in all_new_files
+            }
+
+            # Write files to disk and emit events
+            if new_files and state.project_root:
+                await _write_generated_files(state, new_files)
 
-        logger.info(
-            f"[Code Generator] Generated {len(new_files)} files in batch {batch_to_process.get('batch_id')}"
+            logger.info(
+                "[Code Generator] Generated %s files in batch %s",
+                len(new_files),
+                batch.get("batch_id"),
+            )
+            if state.on_event:
+                state.on_event(f"batch:end:{batch.get('batch_id')}")
+
+            return result_state, new_files
+
+        results = await asyncio.gather(
+            *(process_batch(batch) for batch in ready_batches), return_exceptions=True
         )
 
+        # Combine the per-batch results into one state update
+        result_state = dict(state_dump)
+        all_files: dict[str, str] = dict(state.files)
+        new_files: dict[str, str] = {}
+        # Why each generated batch failed: an exception or the agent's error_message.
+        # A failed batch contributes no files, so its paths stay pending
+        group_errors: dict[str, str] = {}
+        for batch, result in zip(ready_batches, results, strict=True):
+            if isinstance(result, BaseException):
+                group_errors[batch.get("batch_id")] = str(result) or type(result).__name__
+            elif result[0].get("error_message"):
+                group_errors[batch.get("batch_id")] = result[0]["error_message"]
+            else:
+                batch_result, batch_files = result
+                result_state.update(batch_result)
+                all_files.update(batch_result.get("files", {}))
+                new_files.update(batch_files)
+        result_state["files"] = all_files
+        result_state["error_message"] = state.error_message
+
+        # A plan batch failed this attempt if its call failed or left a planned file out.
+        # It stays pending and is retried next tick, up to MAX_BATCH_ATTEMPTS times
+        batch_attempts = dict(state.batch_attempts)
+        failure_reasons = {}
+        for batch in plan_batches:
+            batch_id = batch.get("batch_id")
+            reason = group_errors.get(ready_batches[0].get("batch_id") if coalesced else batch_id)
+            missing = [
+                path
+                for path in batch.get("file_paths", [])
+                if path in pending and path not in new_files
+            ]
+            if not reason and missing:
+                reason = f"missing planned files {missing}"
+            if reason:
+                batch_attempts[batch_id] = batch_attempts.get(batch_id, 0) + 1
+                failure_reasons[batch_id] = reason
+                logger.error(
+                    "[Code Generator] Batch %s failed (attempt %s/%s): %s",
+                    batch_id,
+                    batch_attempts[batch_id],
+                    MAX_BATCH_ATTEMPTS,
+                    reason,
+                )
+                if state.on_event:
+                    state.on_event(f"batch:failed:{batch_id}")
+
         # Update progress
-        updated_generated = {**state.generated_files, **new_files}
-        updated_pending = {k: v for k, v in state.pending_files.items() if k not in new_files}
+        updated_generated = state.generated_files | new_files
+        updated_pending = dict(state.pending_files)
+        for path in new_files:
+            updated_pending.pop(path, None)
         progress = (len(updated_generated), state.file_progress[1])
+        # Route on whether another batch can actually run, not just on pending files:
+        # a batch whose dependencies can never be met would otherwise loop forever
+        exhausted = _exhausted_batches(batch_attempts)
+        work_remaining = (
+            not exhausted
+            and bool(updated_pending)
+            and bool(_find_ready_batches(plan_dict, set(updated_generated), set(updated_pending)))
+        )
+        if exhausted:
+            result_state["error_message"] = "; ".join(
+                f"Batch {batch_id} failed after {batch_attempts[batch_id]} attempts: "
+                f"{failure_reasons.get(batch_id, 'see earlier errors')}"
+                for batch_id in exhausted
+            )
+            if state.on_event:
+                state.on_event("agent:Code Generator:failed")
+        elif not work_remaining:
+            logger.info("[Code Generator] All batches complete")
+            if state.on_event:
+                state.on_event("agent:Code Generator:end")
 
-        if state.on_event:
-            state.on_event(f"batch:end:{batch_to_process.get('batch_id')}")
-
-        merged = _safe_merge(state, result_state)
-        # Remove any duplicate keyword args that are already in merged
-        merged.pop("generated_files", None)
-        merged.pop("pending_files", None)
-        merged.pop("file_progress", None)
-        return GraphState(
-            **merged,
+        update = _agent_updates(result_state)
+        update.update(
             generated_files=updated_generated,
             pending_files=updated_pending,
             file_progress=progress,
-            user_spec=state.user_spec,
-            retry_count=state.retry_count,
-            project_root=state.project_root,
-            on_event=state.on_event,
-            test_mode=state.test_mode,
+            listed_files=sorted(state.files),
+            work_remaining=work_remaining,
+            batch_attempts=batch_attempts,
         )
+        return state.model_copy(update=update)
 
     except Exception as e:
-        logger.error(f"[Code Generator] FAILED: {e}")
+        logger.error("[Code Generator] FAILED: %s", e)
         if state.on_event:
             state.on_event("agent:Code Generator:failed")
         raise
@@ -535,41 +755,26 @@ async def _legacy_code_generator_node(state: GraphState) -> GraphState:
 
     logger.info("[Code Generator] Starting (legacy mode)...")
     try:
-        agent = CodeGenerator()
-        result_state = await agent.run(state.model_dump())
+        agent = _get_agent(CodeGenerator)
+        state_dump = state.model_dump()
+        result_state = await agent.run(state_dump)
 
         # Write generated instruction files to disk
         files = result_state.get("files", {})
         if files:
-            file_ops = FileOps(Path(state.project_root))
-            for path, content in files.items():
-                # Preserve declare_id when writing lib.rs
-                if "lib.rs" in path and state.project_root:
-                    content = _preserve_declare_id(Path(state.project_root), content)
-                file_ops.write_file(path, content)
-                if state.on_event:
-                    state.on_event(f"file:created:{path}:{len(content)}")
+            await _write_generated_files(state, files)
 
-        logger.info(f"[Code Generator] Wrote {len(files)} instruction files (legacy mode)")
+        logger.info("[Code Generator] Wrote %s instruction files (legacy mode)", len(files))
 
         if state.on_event:
             state.on_event("agent:Code Generator:end")
 
-        merged = _safe_merge(state, result_state)
+        update = _agent_updates(result_state)
         # Clear incremental tracking fields in legacy mode
-        merged.pop("pending_files", None)
-        merged.pop("generated_files", None)
-        merged.pop("file_progress", None)
-        return GraphState(
-            **merged,
-            user_spec=state.user_spec,
-            retry_count=state.retry_count,
-            project_root=state.project_root,
-            on_event=state.on_event,
-            test_mode=state.test_mode,
-        )
+        update.update(pending_files={}, generated_files={}, file_progress=(0, 0))
+        return state.model_copy(update=update)
     except Exception as e:
-        logger.error(f"[Code Generator] FAILED: {e}")
+        logger.error("[Code Generator] FAILED: %s", e)
         if state.on_event:
             state.on_event("agent:Code Generator:failed")
         raise
@@ -585,23 +790,36 @@ async def static_validator_node(state: GraphState) -> GraphState:
         if not state.project_root:
             raise ValueError("project_root is None")
 
-        validator = StaticValidator(Path(state.project_root))
-        result = await validator.run(state.model_dump())
+        # On the first attempt validation usually passes, so start the build alongside it
+        build_task = None
+        if get_settings().speculative_build and state.retry_count == 0:
+            builder = _builder(state.project_root)
+            build_task = asyncio.create_task(builder.averify_build(on_event=state.on_event))
 
-        if state.on_event:
-            state.on_event(f"validation:{'success' if result['validation_passed'] else 'failed'}")
-
-        merged = _safe_merge(state, result)
-        return GraphState(
-            **merged,
-            user_spec=state.user_spec,
-            retry_count=state.retry_count,
-            project_root=state.project_root,
-            on_event=state.on_event,
-            test_mode=state.test_mode,
-        )
+        speculative_build = None
+        try:
+            validator = StaticValidator(
+                _project_path(state.project_root), builder=_builder(state.project_root)
+            )
+            state_dump = state.model_dump()
+            result = await validator.run(state_dump)
+            passed = result["validation_passed"]
+
+            if state.on_event:
+                state.on_event(f"validation:{'success' if passed else 'failed'}")
+
+            if build_task and passed:
+                speculative_build = await build_task
+        finally:
+            # Validation failed or raised: kill the anchor build subprocess
+            if build_task and not build_task.done():
+                build_task.cancel()
+
+        update = _agent_updates(result)
+        update.update(validation_passed=passed, speculative_build=speculative_build)
+        return state.model_copy(update=update)
     except Exception as e:
-        logger.error(f"[Static Validator] FAILED: {e}")
+        logger.error("[Static Validator] FAILED: %s", e)
         raise
 
 
@@ -615,28 +833,29 @@ async def build_node(state: GraphState) -> GraphState:
         if not state.project_root:
             raise ValueError("project_root is None")
 
-        builder = Builder(Path(state.project_root))
-        success, output = builder.verify_build()
+        builder = _builder(state.project_root)
+        if state.speculative_build is not None:
+            # Already built while static validation ran
+            success, output = state.speculative_build
+        else:
+            success, output = await builder.averify_build(on_event=state.on_event)
         artifact = builder.get_build_artifact()
 
         if state.on_event:
             state.on_event(f"build:{'success' if success else 'failed'}")
 
-        merged = _safe_merge(state, {})
-        merged.pop("build_logs", None)  # Remove build_logs to avoid duplicate keyword arg
-        return GraphState(
-            **merged,
-            user_spec=state.user_spec,
-            retry_count=state.retry_count,
-            project_root=state.project_root,
-            build_success=success,
-            build_logs=output,
-            final_artifact=str(artifact) if artifact else None,
-            on_event=state.on_event,
-            test_mode=state.test_mode,
+        return state.model_copy(
+            update={
+                "build_success": success,
+                "build_logs": output if success else _extract_diagnostics(output),
+                "build_logs_full": output,
+                "final_artifact": str(artifact) if artifact else None,
+                # A speculative result only stands in for the first build
+                "speculative_build": None,
+            }
         )
     except Exception as e:
-        logger.error(f"[Build Contract] FAILED: {e}")
+        logger.error("[Build Contract] FAILED: %s", e)
         raise
 
 
@@ -648,47 +867,48 @@ async def debugger_node(state: GraphState) -> GraphState:
     logger.info("[Debugger] Starting...")
 
     try:
-        agent = Debugger()
+        agent = _get_agent(Debugger)
         result_state = await agent.run(state.model_dump())
 
-        # Write patched files to disk
-        files = result_state.get("files", {})
-        if files:
-            file_ops = FileOps(Path(state.project_root))
-            file_ops.write_files(files)
-            logger.info(f"[Debugger] Wrote {len(files)} patched files to disk")
+        # Write patched files to disk; everything else is already there
+        files = result_state.get("files", state.files)
+        changed_files = {p: c for p, c in files.items() if state.files.get(p) != c}
+        if changed_files:
+            file_ops = _file_ops(state.project_root)
+            await file_ops.awrite_files(changed_files)
+            logger.info("[Debugger] Wrote %s patched files to disk", len(changed_files))
 
         # Log debugger activity
         if result_state.get("error_message"):
-            logger.warning(f"[Debugger] Failed: {result_state['error_message']}")
+            logger.warning("[Debugger] Failed: %s", result_state["error_message"])
         else:
-            files = result_state.get("files", {})
-            changed_files = set(files.keys())
             patches_count = result_state.get("debugger_patches_count", len(changed_files))
-            logger.info(f"[Debugger] Applied {patches_count} patches to fix issues")
+            logger.info("[Debugger] Applied %s patches to fix issues", patches_count)
 
             # Log analysis
             analysis = result_state.get("debugger_analysis", "")
             if analysis and analysis != "No analysis provided":
-                logger.info(f"[Debugger] Analysis: {analysis[:200]}...")
+                logger.info("[Debugger] Analysis: %.200s...", analysis)
 
             # Log what was fixed
-            logger.info(f"[Debugger] Files modified: {list(changed_files)}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("[Debugger] Files modified: %s", list(changed_files))
 
         if state.on_event:
             state.on_event("agent:Debugger:end")
 
-        merged = _safe_merge(state, result_state)
-        return GraphState(
-            **merged,
-            user_spec=state.user_spec,
-            retry_count=state.retry_count + 1,
-            project_root=state.project_root,
-            on_event=state.on_event,
-            test_mode=state.test_mode,
+        # The debugger only changes files and error_message on the graph state
+        return state.model_copy(
+            update={
+                "files": files,
+                "error_message": result_state.get("error_message")
+                or (None if changed_files else "Debugger made no changes"),
+                "fix_attempted": bool(changed_files),
+                "retry_count": state.retry_count + 1,
+            }
         )
     except Exception as e:
-        logger.error(f"[Debugger] FAILED: {e}")
+        logger.error("[Debugger] FAILED: %s", e)
         if state.on_event:
             state.on_event("agent:Debugger:failed")
         raise
@@ -696,8 +916,11 @@ async def debugger_node(state: GraphState) -> GraphState:
 
 async def abort_node(state: GraphState) -> GraphState:
     """Handle abort - final error state."""
-    logger.warning(f"[Abort] Workflow aborted. Error: {state.error_message}")
-    return state
+    logger.warning("[Abort] Workflow aborted. Error: %s", state.error_message)
+    # Nothing runs after abort, so drop the batch bookkeeping from the final state
+    return state.model_copy(
+        update={"pending_files": {}, "generated_files": {}, "generation_plan": None}
+    )
 
 
 async def run_workflow(
@@ -717,40 +940,58 @@ async def run_workflow(
     Returns:
         Final workflow state
     """
-    if on_event:
-        on_event("workflow:start")
+    # Deliver events from a background task so slow consumers don't stall the nodes
+    events = EventQueue(on_event) if on_event else None
+    if events:
+        events.start()
+        events("workflow:start")
     logger.info("=" * 60)
     logger.info("WORKFLOW STARTED")
-    logger.info(f"User specification: {user_spec[:100]}...")
-    logger.info(f"Project name: {project_name}")
-    logger.info(f"Test mode: {test_mode}")
+    logger.info("User specification: %.100s...", user_spec)
+    logger.info("Project name: %s", project_name)
+    logger.info("Test mode: %s", test_mode)
     logger.info("=" * 60)
 
-    app = create_workflow(test_mode=test_mode).compile()
+    app = _compiled_app(test_mode)
 
     initial_state = GraphState(
         user_spec=user_spec,
         test_mode=test_mode,
         project_name=project_name,
-        on_event=on_event,
+        on_event=events,
     )
 
+    result: dict[str, Any] = {}
+    cache_keys: set[str] = set()
     try:
-        result = await app.ainvoke(initial_state)
+        with track_build_dependent() as cache_keys:
+            result = await app.ainvoke(initial_state)
         logger.info("=" * 60)
         logger.info("WORKFLOW COMPLETED")
-        logger.info(f"Build success: {result.get('build_success')}")
-        logger.info(f"Project root: {result.get('project_root')}")
+        logger.info("Build success: %s", result.get("build_success"))
+        logger.info("Project root: %s", result.get("project_root"))
         logger.info("=" * 60)
-        if on_event:
-            on_event("workflow:end")
+        if events:
+            events("workflow:end")
     except Exception as e:
         logger.error("=" * 60)
         logger.error("WORKFLOW FAILED WITH EXCEPTION")
-        logger.error(f"Error: {e}")
+        logger.error("Error: %s", e)
         logger.error("=" * 60)
-        if on_event:
-            on_event("workflow:failed")
+        if events:
+            events("workflow:failed")
         raise
-
-    return GraphState(**result)
+    finally:
+        if cache_keys and not result.get("build_success"):
+            # Generated code and fixes that didn't build must not be replayed next run
+            logger.info("Discarding %s cached responses from the failed run", len(cache_keys))
+            get_llm_cache().delete(cache_keys)
+        if events:
+            await events.aclose()
+
+    # Every value has already been validated by a node; only the Spec Interpreter's
+    # nested spec travels as a plain dict
+    spec = result.get("interpreted_spec")
+    if isinstance(spec, dict):
+        result["interpreted_spec"] = TokenSpec.model_validate(spec)
+    return GraphState.model_construct(**result)
@@ -3,10 +3,12 @@
 from collections.abc import Callable
 from enum import Enum
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 # Constants
 MAX_RETRIES = 1
+# Times one plan batch is generated before the workflow gives up on it
+MAX_BATCH_ATTEMPTS = 3
 
 
 class ContractFeature(str, Enum):
@@ -58,8 +60,7 @@ class TokenSpec(BaseModel):
         description="Custom data structures as list of {'name': ..., 'fields': [...]}",
     )
 
-    class Config:
-        use_enum_values = True
+    model_config = ConfigDict(use_enum_values=True)
 
 
 class GraphState(BaseModel):
@@ -74,6 +75,8 @@ class GraphState(BaseModel):
     validation_errors: list[str] = Field(default_factory=list)
     build_success: bool = Field(default=False)
     build_logs: str | None = Field(default=None)
+    # Untrimmed build output, for display only; excluded from the dumps agents receive
+    build_logs_full: str | None = Field(default=None, exclude=True)
     final_artifact: str | None = Field(default=None)
     fix_attempted: bool = Field(default=False)
     retry_count: int = Field(default=0)
@@ -87,6 +90,15 @@ class GraphState(BaseModel):
     pending_files: dict[str, str] = Field(default_factory=dict)
     generated_files: dict[str, str] = Field(default_factory=dict)
     file_progress: tuple[int, int] = Field(default=(0, 0))
+    # Paths the code generator already saw in the previous batch step, so large
+    # projects can list only the files that are new since then
+    listed_files: list[str] = Field(default_factory=list)
+    # Whether batch_processor has a ready batch left; set by the workflow, never by agents
+    work_remaining: bool = Field(default=True)
+    # Failed generation attempts per plan batch id; set by the workflow, never by agents
+    batch_attempts: dict[str, int] = Field(default_factory=dict)
+    # (success, output) of a build started alongside static validation, for build_node to use
+    speculative_build: tuple[bool, str] | None = Field(default=None)
 
     # Generation mode for code_generator (FILE_MODE or INJECTION_MODE)
     generation_mode: str | None = Field(default=None, description="FILE_MODE or INJECTION_MODE")
@@ -111,10 +123,17 @@ class DebuggerPatch(BaseModel):
     """Patch specification from debugger agent."""
 
     path: str = Field(..., description="File path")
-    content: str = Field(..., description="New file content")
+    unified_diff: str = Field(..., description="Unified diff (@@ hunks) against the current file")
     reason: str | None = Field(default=None, description="Why this patch is needed")
 
 
+class DebuggerOutput(BaseModel):
+    """Structured output from the debugger agent."""
+
+    patches: list[DebuggerPatch] = Field(..., description="Patches that fix the errors")
+    analysis: str = Field(..., description="What was wrong and how it was fixed")
+
+
 class ProjectFile(BaseModel):
     """A single file in the project."""
 
@@ -1,8 +1,65 @@
 """Build utilities for Solana smart contracts."""
 
+import asyncio
+import os
+import shutil
 import subprocess
+import sys
+from collections.abc import Callable
+from functools import lru_cache
 from pathlib import Path
 
+# Compilation caches shared by every generated project, next to the LLM cache
+CACHE_DIR = Path.home() / ".cache" / "smart-contract-generator"
+SCCACHE_DIR = CACHE_DIR / "sccache"
+# Target dir for cargo check only: it emits no program artifacts, so projects can share
+# dependency metadata. anchor build keeps its per-project target/ (keypair, .so, IDL).
+CHECK_TARGET_DIR = CACHE_DIR / "target" / "check"
+
+# Bytes read per call when streaming command output to the terminal
+STREAM_CHUNK_SIZE = 65536
+
+# Written to the project root once an online cargo run succeeded with a Cargo.lock, so the
+# locked dependencies are in the local registry and later runs can skip the index refresh
+DEPS_MARKER = ".ail_deps_fetched"
+# cargo output meaning an offline run lacked a dependency rather than hit a compile error
+_OFFLINE_MISS_MARKERS = (
+    "no matching package",
+    "failed to download",
+    "attempting to make an HTTP request",
+    "--frozen was passed",
+    "--locked was passed",
+)
+# Project-root files read by anchor build and cargo: workspace config and locked dependencies
+_ROOT_BUILD_FILES = ("Anchor.toml", "Cargo.toml", "Cargo.lock")
+# Per-program build manifests under programs/, next to the .rs sources
+_PROGRAM_BUILD_FILES = frozenset({"Cargo.toml", "Xargo.toml"})
+
+
+@lru_cache
+def _build_env() -> dict[str, str]:
+    """Environment for build subprocesses, computed once per process.
+
+    When sccache is installed it wraps rustc, so dependencies compiled for one
+    generated project are served from its cache in the next. Incremental
+    compilation is off: builds here are one-shot, its artifacts only grow
+    target/, and sccache can't cache incrementally compiled crates. Values
+    already set in the environment win.
+    """
+    env = os.environ.copy()
+    env.setdefault("CARGO_INCREMENTAL", "0")
+    if shutil.which("sccache"):
+        env.setdefault("RUSTC_WRAPPER", "sccache")
+        env.setdefault("SCCACHE_DIR", str(SCCACHE_DIR))
+    return env
+
+
+@lru_cache(maxsize=1)
+def _probe_tools(tools: tuple[str, ...]) -> tuple[bool, tuple[str, ...]]:
+    """Look up tools on PATH once per process; the toolchain doesn't change mid-run."""
+    missing = tuple(tool for tool in tools if shutil.which(tool) is None)
+    return not missing, missing
+
 
 class Builder:
     """Build utilities for Anchor/Rust Solana projects."""
@@ -14,6 +71,14 @@ class Builder:
             project_path: Path to the Anchor project directory
         """
         self.project_path = Path(project_path)
+        # (target/deploy mtime, artifact) from the last get_build_artifact call
+        self._artifact_cache: tuple[int, Path | None] | None = None
+        # Absolute tool paths so each spawn skips the PATH search; unresolved names stay bare
+        self._tools = {name: shutil.which(name) or name for name in ("cargo", "anchor", "rustfmt")}
+
+    def _resolve(self, cmd: list[str]) -> list[str]:
+        """Replace a known tool name with its pre-resolved absolute path."""
+        return [self._tools.get(cmd[0], cmd[0]), *cmd[1:]]
 
     def run_command(
         self,
@@ -21,6 +86,7 @@ class Builder:
         capture_output: bool = False,
         timeout: int | None = 300,
         stream_output: bool = False,
+        env: dict[str, str] | None = None,
     ) -> tuple[bool, str, str]:
         """Run a shell command in the project directory.
 
@@ -29,6 +95,7 @@ class Builder:
             capture_output: Whether to capture stdout/stderr (for return value)
             timeout: Command timeout in seconds
             stream_output: Whether to stream output to terminal in real-time
+            env: Subprocess environment, defaults to the shared build environment
 
         Returns:
             Tuple of (success, stdout, stderr)
@@ -38,27 +105,36 @@ class Builder:
                 # Stream output to terminal while still capturing
                 # cmd is built from hardcoded strings (anchor, cargo), safe to run
                 process = subprocess.Popen(  # noqa: S602,S603
-                    cmd,
+                    self._resolve(cmd),
                     cwd=self.project_path,
+                    env=env or _build_env(),
                     stdout=subprocess.PIPE,
                     stderr=subprocess.STDOUT,
-                    text=True,
+                    bufsize=0,
                 )
 
-                output_lines = []
-                for line in process.stdout:
-                    print(line, end="")  # Stream to terminal
-                    output_lines.append(line)
+                # Pass raw chunks straight through, decoding the capture once at the end
+                terminal = getattr(sys.stdout, "buffer", None)
+                output = bytearray()
+                fd = process.stdout.fileno()
+                while chunk := os.read(fd, STREAM_CHUNK_SIZE):
+                    output += chunk
+                    if terminal:
+                        terminal.write(chunk)
+                        terminal.flush()
+                    else:
+                        sys.stdout.write(chunk.decode(errors="replace"))
 
                 process.wait()
-                output = "".join(output_lines) if output_lines else ""
-                return process.returncode == 0, output, ""
+                return process.returncode == 0, output.decode(errors="replace"), ""
 
             result = subprocess.run(  # noqa: S603
-                cmd,
+                self._resolve(cmd),
                 cwd=self.project_path,
+                env=env or _build_env(),
                 capture_output=capture_output,
-                text=True,
+                # Uncaptured output goes straight to the inherited fds; nothing to decode
+                text=capture_output,
                 timeout=timeout,
                 check=False,
             )
@@ -74,22 +150,49 @@ class Builder:
         Returns:
             Tuple of (success, output)
         """
-        success, stdout, stderr = self.run_command(
-            ["cargo", "check", "--target", "sbf-solana-solana"]
-        )
+        env = _build_env()
+        if "CARGO_TARGET_DIR" not in env:
+            env = {**env, "CARGO_TARGET_DIR": str(CHECK_TARGET_DIR)}
+        return self._run_cargo(["check", "--target", "sbf-solana-solana"], env=env)
+
+    def _run_cargo(self, args: list[str], env: dict[str, str] | None = None) -> tuple[bool, str]:
+        """Run a cargo subcommand, offline when the project's dependencies are known fetched.
+
+        Falls back to a normal run if the offline one fails for a missing dependency.
+
+        Returns:
+            Tuple of (success, output)
+        """
+        marker = self.project_path / DEPS_MARKER
+        if marker.exists() and (self.project_path / "Cargo.lock").exists():
+            success, stdout, stderr = self.run_command(
+                ["cargo", *args, "--frozen", "--offline"], capture_output=True, env=env
+            )
+            output = stdout + stderr
+            if success or not any(miss in output for miss in _OFFLINE_MISS_MARKERS):
+                return success, output
+            marker.unlink(missing_ok=True)
+
+        success, stdout, stderr = self.run_command(["cargo", *args], capture_output=True, env=env)
+        if success and (self.project_path / "Cargo.lock").exists():
+            marker.touch()
         return success, (stdout or "") + (stderr or "")
 
-    def rustfmt(self, file_path: Path | None = None) -> tuple[bool, str]:
+    def rustfmt(self, file_paths: Path | list[Path] | None = None) -> tuple[bool, str]:
         """Run rustfmt on files.
 
         Args:
-            file_path: Specific file to format, or None for all files
+            file_paths: File or files to format in one rustfmt run, or None for all files
 
         Returns:
             Tuple of (success, output)
         """
-        if file_path:
-            success, stdout, stderr = self.run_command(["rustfmt", str(file_path)])
+        if isinstance(file_paths, Path):
+            file_paths = [file_paths]
+        if file_paths is not None:
+            if not file_paths:
+                return True, ""
+            success, stdout, stderr = self.run_command(["rustfmt", *map(str, file_paths)])
         else:
             # Format all Rust files
             success, stdout, stderr = self.run_command(["cargo", "+nightly", "fmt"])
@@ -116,8 +219,7 @@ class Builder:
         Returns:
             Tuple of (success, output)
         """
-        success, stdout, stderr = self.run_command(["cargo", "build-sbf"])
-        return success, (stdout or "") + (stderr or "")
+        return self._run_cargo(["build-sbf"])
 
     def get_build_artifact(self) -> Path | None:
         """Get the build artifact path.
@@ -125,11 +227,56 @@ class Builder:
         Returns:
             Path to the compiled program .so file, or None
         """
-        # Look for .so files in target/deploy
+        # Look for .so files in target/deploy; adding or removing one changes its mtime
         deploy_dir = self.project_path / "target" / "deploy"
-        if deploy_dir.exists():
-            for f in deploy_dir.glob("*.so"):
-                return f
+        try:
+            mtime = os.stat(deploy_dir).st_mtime_ns
+        except OSError:
+            return None
+        if self._artifact_cache and self._artifact_cache[0] == mtime:
+            return self._artifact_cache[1]
+
+        with os.scandir(deploy_dir) as entries:
+            artifact = next(
+                (Path(entry.path) for entry in entries if entry.name.endswith(".so")), None
+            )
+        self._artifact_cache = (mtime, artifact)
+        return artifact
+
+    def _sources_newer_than(self, artifact: Path) -> bool:
+        """Check whether any build input changed after artifact was built.
+
+        Inputs are the .rs, Cargo.toml and Xargo.toml files under programs/ and the
+        root Anchor.toml, Cargo.toml and Cargo.lock.
+        """
+        built_at = os.stat(artifact).st_mtime_ns
+        for name in _ROOT_BUILD_FILES:
+            try:
+                if os.stat(self.project_path / name).st_mtime_ns > built_at:
+                    return True
+            except OSError:
+                continue
+        pending = [self.project_path / "programs"]
+        while pending:
+            try:
+                entries = os.scandir(pending.pop())
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif (
+                        entry.name.endswith(".rs") or entry.name in _PROGRAM_BUILD_FILES
+                    ) and entry.stat().st_mtime_ns > built_at:
+                        return True
+        return False
+
+    def _up_to_date_artifact(self) -> Path | None:
+        """Return the build artifact if no build input is newer than it."""
+        artifact = self.get_build_artifact()
+        if artifact and not self._sources_newer_than(artifact):
+            return artifact
         return None
 
     def verify_build(self, stream: bool = True) -> tuple[bool, str]:
@@ -141,6 +288,9 @@ class Builder:
         Returns:
             Tuple of (success, output)
         """
+        if artifact := self._up_to_date_artifact():
+            return True, f"Build skipped (up-to-date): {artifact}"
+
         # First try anchor build
         success, output = self.anchor_build(stream=stream)
         if success:
@@ -150,26 +300,86 @@ class Builder:
             return True, "Build successful (artifact location unknown)"
         return False, output
 
+    async def averify_build(
+        self, on_event: Callable[[str], None] | None = None
+    ) -> tuple[bool, str]:
+        """Run full build verification without blocking the event loop.
+
+        Output lines are emitted as ``build:log:<line>`` events as they arrive,
+        or printed when there is no callback. Cancelling the call kills the build.
+
+        Args:
+            on_event: Optional callback for build log events
+
+        Returns:
+            Tuple of (success, output)
+        """
+        if artifact := self._up_to_date_artifact():
+            return True, f"Build skipped (up-to-date): {artifact}"
+
+        success, output = await self._astream_command(["anchor", "build"], on_event)
+        if success:
+            artifact = self.get_build_artifact()
+            if artifact:
+                return True, f"Build successful: {artifact}"
+            return True, "Build successful (artifact location unknown)"
+        return False, output
+
+    async def _astream_command(
+        self, cmd: list[str], on_event: Callable[[str], None] | None = None
+    ) -> tuple[bool, str]:
+        """Run a command as an asyncio subprocess, streaming its combined output.
+
+        Returns:
+            Tuple of (success, output)
+        """
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *self._resolve(cmd),
+                cwd=self.project_path,
+                env=_build_env(),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+            )
+        except FileNotFoundError:
+            return False, f"Command not found: {cmd[0]}"
+
+        # Read fixed-size chunks rather than lines: a line longer than the StreamReader
+        # limit (64 KiB) would raise mid-build
+        terminal = getattr(sys.stdout, "buffer", None)
+        output = bytearray()
+        partial = b""
+        try:
+            while chunk := await process.stdout.read(STREAM_CHUNK_SIZE):
+                output += chunk
+                if on_event:
+                    *lines, partial = (partial + chunk).split(b"\n")
+                    for line in lines:
+                        on_event(f"build:log:{line.decode(errors='replace').rstrip()}")
+                elif terminal:
+                    terminal.write(chunk)
+                    terminal.flush()
+                else:
+                    sys.stdout.write(chunk.decode(errors="replace"))
+            if on_event and partial:
+                on_event(f"build:log:{partial.decode(errors='replace').rstrip()}")
+            await process.wait()
+        finally:
+            # Cancelled, or a read or callback raised: don't leave the build running
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+        return process.returncode == 0, output.decode(errors="replace")
+
     def check_prerequisites(self) -> tuple[bool, list[str]]:
         """Check if build prerequisites are available.
 
         Returns:
             Tuple of (all_available, list of missing tools)
         """
-        missing = []
         tools = ["cargo", "rustc", "anchor"]  # anchor is optional
-
-        for tool in tools:
-            result = subprocess.run(  # noqa: S603
-                ["/usr/bin/which", tool],
-                capture_output=True,
-                text=True,
-                check=False,
-            )
-            if result.returncode != 0:
-                missing.append(tool)
-
-        return len(missing) == 0, missing
+        available, missing = _probe_tools(tuple(tools))
+        return available, list(missing)
 
     def anchor_init(self, project_name: str) -> tuple[bool, str]:
         """Run anchor init to create fresh Anchor project structure.
@@ -0,0 +1,90 @@
+"""Non-blocking delivery of workflow progress events."""
+
+import asyncio
+import logging
+from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+# Progress-only events that are dropped first when the queue is full
+_DROPPABLE_PREFIXES = ("file:generating:", "file:streamed:", "build:log:")
+
+
+class _EventBuffer(asyncio.Queue):
+    """Unbounded event queue that can discard its oldest progress-only event."""
+
+    def discard_droppable(self) -> bool:
+        """Remove the oldest droppable event, returning whether there was one."""
+        for i, event in enumerate(self._queue):
+            if event.startswith(_DROPPABLE_PREFIXES):
+                del self._queue[i]
+                # Keep join() balanced for the item that will never be delivered
+                self.task_done()
+                return True
+        return False
+
+
+class EventQueue:
+    """Callable event sink that hands events to ``on_event`` from a background task.
+
+    Nodes call it exactly like the original callback, but the call is a
+    ``put_nowait``, so a slow consumer (console rendering, a websocket push)
+    never stalls file writes or LLM calls. The callback runs in a worker
+    thread, in emission order; events queued while it is busy are delivered
+    together in the next hop.
+    """
+
+    def __init__(self, on_event: Callable[[str], None], maxsize: int = 10000):
+        """Initialize the queue.
+
+        Args:
+            on_event: Callback that receives each event
+            maxsize: Maximum number of undelivered events. Lifecycle events may exceed
+                it when every queued event is a lifecycle event.
+        """
+        self.on_event = on_event
+        self.maxsize = maxsize
+        self._queue: _EventBuffer = _EventBuffer()
+        self._consumer: asyncio.Task | None = None
+
+    def __call__(self, event: str) -> None:
+        """Queue an event for delivery without blocking."""
+        if self._queue.qsize() >= self.maxsize:
+            if event.startswith(_DROPPABLE_PREFIXES):
+                return
+            # Make room for a lifecycle event by discarding a progress event; lifecycle
+            # events (batch:failed:, build:*) are never dropped
+            self._queue.discard_droppable()
+        self._queue.put_nowait(event)
+
+    def start(self) -> None:
+        """Start the background consumer on the running event loop."""
+        if self._consumer is None:
+            self._consumer = asyncio.create_task(self._drain())
+
+    async def _drain(self) -> None:
+        while True:
+            # Hand everything queued so far to one worker thread hop
+            events = [await self._queue.get()]
+            while not self._queue.empty():
+                events.append(self._queue.get_nowait())
+            try:
+                await asyncio.to_thread(self._deliver, events)
+            finally:
+                for _ in events:
+                    self._queue.task_done()
+
+    def _deliver(self, events: list[str]) -> None:
+        for event in events:
+            try:
+                self.on_event(event)
+            except Exception:
+                logger.exception("on_event callback failed for %r", event)
+
+    async def aclose(self) -> None:
+        """Deliver every queued event, then stop the consumer."""
+        if self._consumer is None:
+            return
+        await self._queue.join()
+        self._consumer.cancel()
+        self._consumer = None
@@ -1,5 +1,6 @@
 """File operations for reading and writing project files."""
 
+import asyncio
 import shutil
 from pathlib import Path
 
@@ -22,11 +23,34 @@ class FileOps:
     def write_files(self, files: dict[str, str]) -> None:
         """Write multiple files atomically.
 
+        Paths are resolved up front so each parent directory is created once,
+        however many files it receives.
+
+        Args:
+            files: Dictionary mapping relative paths to file contents
+        """
+        for file_path, content in self._prepare(files).items():
+            self._replace(file_path, content)
+
+    async def awrite_files(self, files: dict[str, str]) -> None:
+        """Write multiple files atomically from worker threads, without blocking the event loop.
+
+        Each file is replaced in its own thread, so the writes overlap.
+
         Args:
             files: Dictionary mapping relative paths to file contents
         """
-        for rel_path, content in files.items():
-            self.write_file(rel_path, content)
+        resolved = await asyncio.to_thread(self._prepare, files)
+        await asyncio.gather(
+            *(asyncio.to_thread(self._replace, path, content) for path, content in resolved.items())
+        )
+
+    def _prepare(self, files: dict[str, str]) -> dict[Path, str]:
+        """Resolve every path and create each parent directory once."""
+        resolved = {self._resolve(rel_path): content for rel_path, content in files.items()}
+        for parent in {file_path.parent for file_path in resolved}:
+            parent.mkdir(parents=True, exist_ok=True)
+        return resolved
 
     def write_file(self, rel_path: str, content: str) -> None:
         """Write a single file atomically.
@@ -37,7 +61,10 @@ class FileOps:
         """
         file_path = self._resolve(rel_path)
         file_path.parent.mkdir(parents=True, exist_ok=True)
-        # Atomic write with temp file
+        self._replace(file_path, content)
+
+    def _replace(self, file_path: Path, content: str) -> None:
+        """Atomically replace file_path (whose directory exists) via a temp file."""
         tmp = file_path.with_suffix(file_path.suffix + ".tmp")
         tmp.write_text(content, encoding="utf-8", newline="\n")
         try:
@@ -0,0 +1,143 @@
+"""Incremental JSON parsing for streamed LLM output."""
+
+import json
+
+import orjson
+
+
+class JsonItemStream:
+    """Extract completed objects from a top-level JSON array while text streams in.
+
+    Feed raw text chunks as they arrive. Each call to ``feed`` returns the items
+    of the ``field`` array (e.g. ``{"files": [{...}, {...}]}``) whose closing
+    brace appeared in that chunk, so callers can act on them before the whole
+    document has been generated.
+    """
+
+    def __init__(self, field: str):
+        """Initialize the parser.
+
+        Args:
+            field: Name of the top-level array whose items should be emitted
+        """
+        self.field = field
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._in_field = False
+        self._last_key = ""
+        self._key_parts: list[str] | None = None
+        self._item_parts: list[str] | None = None
+
+    def feed(self, chunk: str) -> list[dict]:
+        """Consume a chunk of text and return the items completed by it."""
+        items = []
+        item_start = 0 if self._item_parts is not None else None
+        key_start = 0 if self._key_parts is not None else None
+
+        for i, ch in enumerate(chunk):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._key_parts is not None:
+                        self._key_parts.append(chunk[key_start:i])
+                        self._last_key = "".join(self._key_parts)
+                        self._key_parts = None
+                        key_start = None
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    # Strings directly inside the root object are keys (or scalar values)
+                    self._key_parts = []
+                    key_start = i + 1
+            elif ch in "{[":
+                self._depth += 1
+                if ch == "[" and self._depth == 2 and self._last_key == self.field:
+                    self._in_field = True
+                elif ch == "{" and self._in_field and self._depth == 3:
+                    self._item_parts = []
+                    item_start = i
+            elif ch in "}]":
+                if ch == "}" and self._item_parts is not None and self._depth == 3:
+                    self._item_parts.append(chunk[item_start : i + 1])
+                    items.append(json.loads("".join(self._item_parts)))
+                    self._item_parts = None
+                    item_start = None
+                elif ch == "]" and self._depth == 2:
+                    self._in_field = False
+                self._depth -= 1
+
+        # Carry partial item/key text over to the next chunk
+        if self._item_parts is not None:
+            self._item_parts.append(chunk[item_start:])
+        if self._key_parts is not None:
+            self._key_parts.append(chunk[key_start:])
+        return items
+
+
+class JsonObjectStream:
+    """Find the end of the first top-level JSON object while text streams in.
+
+    Text before the opening brace (e.g. a ```json fence) is skipped. A balanced
+    ``{...}`` is only a candidate: prose such as "fill in {name}" is skipped if it
+    doesn't decode, and the scan resumes after its opening brace. Once a
+    candidate decodes, ``feed`` returns its text, so the caller can stop reading
+    and ignore whatever the model writes after it.
+    """
+
+    def __init__(self):
+        """Initialize the parser."""
+        self._text = ""
+        self._pos = 0
+        self._start = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> str | None:
+        """Consume a chunk of text and return the complete object text, if it just closed."""
+        self._text += chunk
+        text = self._text
+        i = self._pos
+        while i < len(text):
+            ch = text[i]
+            i += 1
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == "{":
+                if not self._depth:
+                    self._start = i - 1
+                self._depth += 1
+            elif not self._depth:
+                # Still before the object, e.g. inside a leading markdown fence
+                continue
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "}":
+                self._depth -= 1
+                if not self._depth:
+                    candidate = text[self._start : i]
+                    try:
+                        orjson.loads(candidate)
+                    except orjson.JSONDecodeError:
+                        # Braces in prose; look for the object after this opening brace
+                        i = self._start + 1
+                        continue
+                    self._pos = i
+                    return candidate
+
+        self._pos = i
+        return None
@@ -0,0 +1,255 @@
+"""Persistent content-hash cache for LLM responses.
+
+Validation/build retries often re-send byte-identical prompts (same spec, same
+files, same errors). Responses are stored in SQLite keyed on a hash of the
+normalized request, so a repeated request is answered without an LLM call.
+Entries expire after ``CACHE_TTL`` seconds, and generated code or fixes are
+dropped again when the run that used them doesn't build. Set ``LLM_CACHE=0``
+to bypass the cache.
+"""
+
+import hashlib
+import importlib
+import os
+import sqlite3
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from pathlib import Path
+
+import orjson
+from langchain_core.messages import AIMessage, BaseMessage
+
+CACHE_PATH = Path.home() / ".cache" / "smart-contract-generator" / "llm.db"
+# Seconds an entry is served for; older ones are pruned when the cache is opened
+CACHE_TTL = 7 * 86400
+
+# Keys of build-dependent entries used by the current workflow run, if it tracks them
+_build_dependent_keys: ContextVar[set[str] | None] = ContextVar(
+    "build_dependent_keys", default=None
+)
+
+
+def llm_cache_enabled() -> bool:
+    """Check whether the LLM cache is enabled (disable with LLM_CACHE=0)."""
+    return os.environ.get("LLM_CACHE", "1") != "0"
+
+
+def _normalize_text(text: str) -> str:
+    """Strip trailing whitespace per line so formatting noise doesn't miss the cache."""
+    return "\n".join(line.rstrip() for line in text.strip().splitlines())
+
+
+def _normalize_message(message) -> dict:
+    """Reduce a LangChain message or role/content dict to comparable text."""
+    if isinstance(message, dict):
+        role, content = message.get("role", ""), message.get("content", "")
+    else:
+        role, content = message.type, message.content
+    if isinstance(content, list):
+        # Content blocks (e.g. cache_control breakpoints) - only the text matters
+        content = "".join(
+            block.get("text", "") if isinstance(block, dict) else str(block) for block in content
+        )
+    return {"role": role, "content": _normalize_text(content)}
+
+
+def make_cache_key(model: str, namespace: str, messages, context: str = "") -> str:
+    """Hash the normalized request into a cache key.
+
+    Args:
+        model: Model identifier the request is sent to
+        namespace: Agent name, which fixes the system prompt and response schema
+        messages: Message list, or a ``{"messages": [...]}`` agent input
+        context: Extra request-specific data, e.g. digests of the files involved
+    """
+    if isinstance(messages, dict):
+        messages = messages.get("messages", [])
+    payload = {
+        "model": model,
+        "namespace": namespace,
+        "messages": [_normalize_message(m) for m in messages],
+        "context": context,
+    }
+    return hashlib.sha256(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+def _encode_response(response) -> tuple[str, str]:
+    """Serialize a response into a (kind, value) pair for storage."""
+    if isinstance(response, BaseMessage):
+        return "message", response.content
+    if hasattr(response, "model_dump"):
+        cls = type(response)
+        envelope = {"schema": f"{cls.__module__}:{cls.__qualname__}", "data": response.model_dump()}
+        return "model", orjson.dumps(envelope).decode()
+    if isinstance(response, dict):
+        # ReAct agent result - only the final output is ever read back
+        messages = response.get("messages", [])
+        output = response.get("output") or next(
+            (m.content for m in reversed(messages) if isinstance(m, BaseMessage)), ""
+        )
+        return "agent", output
+    raise TypeError(f"Cannot cache response of type {type(response).__name__}")
+
+
+def _decode_response(kind: str, value: str):
+    """Rebuild a response from its stored (kind, value) pair."""
+    if kind == "model":
+        envelope = orjson.loads(value)
+        module_name, qualname = envelope["schema"].split(":")
+        schema = getattr(importlib.import_module(module_name), qualname)
+        return schema.model_validate(envelope["data"])
+    if kind == "agent":
+        return {"output": value}
+    return AIMessage(content=value)
+
+
+def record_build_dependent(key: str) -> None:
+    """Note that the current run used a cache entry that is only good if the run builds."""
+    keys = _build_dependent_keys.get()
+    if keys is not None:
+        keys.add(key)
+
+
+@contextmanager
+def track_build_dependent() -> Iterator[set[str]]:
+    """Collect the keys passed to record_build_dependent inside the block."""
+    keys: set[str] = set()
+    token = _build_dependent_keys.set(keys)
+    try:
+        yield keys
+    finally:
+        _build_dependent_keys.reset(token)
+
+
+class LLMCache:
+    """SQLite-backed store of LLM responses keyed by request hash."""
+
+    def __init__(self, path: Path = CACHE_PATH, ttl: float = CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._conn: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, "
+                    "kind TEXT NOT NULL, value TEXT NOT NULL, created REAL NOT NULL DEFAULT 0)"
+                )
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(responses)")}
+                if "created" not in columns:
+                    # Caches written before entries expired; their rows are pruned below
+                    conn.execute("ALTER TABLE responses ADD COLUMN created REAL NOT NULL DEFAULT 0")
+                conn.execute("DELETE FROM responses WHERE created < ?", (self._cutoff(),))
+            self._conn = conn
+        return self._conn
+
+    def _cutoff(self) -> float:
+        return time.time() - self.ttl
+
+    def get(self, key: str):
+        """Return the cached response for key, or None on a miss."""
+        row = (
+            self._connect()
+            .execute(
+                "SELECT kind, value FROM responses WHERE key = ? AND created >= ?",
+                (key, self._cutoff()),
+            )
+            .fetchone()
+        )
+        return _decode_response(*row) if row else None
+
+    def set(self, key: str, response) -> None:
+        """Store a response under key."""
+        kind, value = _encode_response(response)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, kind, value, created) VALUES (?, ?, ?, ?)",
+                (key, kind, value, time.time()),
+            )
+
+    def delete(self, keys) -> None:
+        """Remove the entries stored under keys."""
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM responses WHERE key = ?", ((key,) for key in keys))
+
+
+@lru_cache
+def get_llm_cache() -> LLMCache:
+    """Get the shared on-disk LLM cache."""
+    return LLMCache()
+
+
+class CachedRunnable:
+    """Wrap an agent executor so identical requests are answered from the cache.
+
+    Accepts the same ``ainvoke`` calls as the wrapped executor plus an
+    optional ``cache_context`` string that is folded into the key, and an
+    optional ``cache_if`` predicate a fresh response must pass to be stored.
+    ``refresh=True`` skips the lookup, so a retry gets a fresh response.
+    Streaming executors are supported: on a hit, cached list items are
+    replayed to ``on_item`` so callers see the same events as on a live call.
+    """
+
+    def __init__(
+        self,
+        runnable,
+        model: str,
+        namespace: str,
+        enabled: bool | None = None,
+        build_dependent: bool = False,
+    ):
+        """Initialize the cached executor.
+
+        Args:
+            runnable: Executor to wrap (chat model, structured chain or agent)
+            model: Model identifier, part of the cache key
+            namespace: Agent name, part of the cache key
+            enabled: Override for the LLM_CACHE environment switch
+            build_dependent: Whether responses are code that must build to stay cached
+        """
+        self.runnable = runnable
+        self.model = model
+        self.namespace = namespace
+        self.enabled = llm_cache_enabled() if enabled is None else enabled
+        self.build_dependent = build_dependent
+        self.streams_items = getattr(runnable, "streams_items", False)
+
+    def _replay_items(self, response, on_item: Callable | None) -> None:
+        items_field = getattr(self.runnable, "items_field", None)
+        if on_item and items_field:
+            for item in getattr(response, items_field, []):
+                on_item(item)
+
+    async def ainvoke(
+        self,
+        messages,
+        cache_context: str = "",
+        cache_if: Callable[[object], bool] | None = None,
+        refresh: bool = False,
+        **kwargs,
+    ):
+        """Return the cached response, or invoke the executor and cache its result."""
+        if not self.enabled:
+            return await self.runnable.ainvoke(messages, **kwargs)
+
+        cache = get_llm_cache()
+        key = make_cache_key(self.model, self.namespace, messages, cache_context)
+        cached = None if refresh else cache.get(key)
+        if cached is not None:
+            if self.build_dependent:
+                record_build_dependent(key)
+            self._replay_items(cached, kwargs.get("on_item"))
+            return cached
+
+        response = await self.runnable.ainvoke(messages, **kwargs)
+        if cache_if is None or cache_if(response):
+            cache.set(key, response)
+            if self.build_dependent:
+                record_build_dependent(key)
+        return response
@@ -1,21 +1,47 @@
 """Unified LLM utilities for LangChain and Mock providers."""
 
+import typing
+from collections.abc import Callable
+from functools import lru_cache
+
 from src.config import get_settings
+from src.utils.json_stream import JsonItemStream, JsonObjectStream
+
+# OpenRouter model prefixes that honour explicit `cache_control` breakpoints.
+# Other providers (OpenAI, Grok, Gemini) cache repeated prefixes automatically.
+PROMPT_CACHE_PREFIXES = ("anthropic/",)
+
+# OpenRouter model prefixes that accept a `prompt_cache_key` routing hint.
+PROMPT_CACHE_KEY_PREFIXES = ("openai/",)
 
 
 def get_langchain_llm(
     model: str | None = None,
     temperature: float = 0.1,
+    prompt_cache_key: str | None = None,
 ):
-    """Get a LangChain-compatible LLM for OpenRouter."""
+    """Get a LangChain-compatible LLM for OpenRouter.
+
+    Args:
+        model: OpenRouter model identifier
+        temperature: Sampling temperature
+        prompt_cache_key: Routing hint so requests sharing a prompt prefix hit the
+            same provider cache; only sent to models that accept it
+    """
     from langchain_openai import ChatOpenAI
 
     settings = get_settings()
     api_key = settings.openrouter_api_key
+    model = model or "google/gemini-2.5-pro"
+
+    model_kwargs = {}
+    if prompt_cache_key and model.startswith(PROMPT_CACHE_KEY_PREFIXES):
+        model_kwargs["prompt_cache_key"] = prompt_cache_key
 
     return ChatOpenAI(
-        model=model or "google/gemini-2.5-pro",
+        model=model,
         temperature=temperature,
+        model_kwargs=model_kwargs,
         api_key=api_key,
         base_url="https://openrouter.ai/api/v1",
         default_headers={
@@ -25,13 +51,174 @@ def get_langchain_llm(
     )
 
 
-def create_agent_executor(llm, tools, system_prompt: str):
-    """Create a LangGraph prebuilt ReAct agent."""
+def supports_prompt_caching(model: str | None) -> bool:
+    """Check if the model needs explicit cache breakpoints for prompt caching."""
+    return bool(model) and model.startswith(PROMPT_CACHE_PREFIXES)
+
+
+def build_system_message(system_prompt: str, model: str | None = None):
+    """Build the system message, marking it cacheable when the provider supports it.
+
+    The system prompt is static per agent, so it is sent as a single cached block.
+    Anything request-specific belongs in the human message, after the cache boundary.
+    """
+    from langchain_core.messages import SystemMessage
+
+    if not supports_prompt_caching(model):
+        return SystemMessage(content=system_prompt)
+
+    return SystemMessage(
+        content=[
+            {
+                "type": "text",
+                "text": system_prompt,
+                "cache_control": {"type": "ephemeral"},
+            }
+        ]
+    )
+
+
+def create_agent_executor(llm, tools, system_prompt):
+    """Create a LangGraph prebuilt ReAct agent.
+
+    Args:
+        llm: LangChain chat model
+        tools: Tools available to the agent
+        system_prompt: System prompt string or prebuilt SystemMessage
+    """
     from langgraph.prebuilt import create_react_agent
 
     return create_react_agent(llm, tools, prompt=system_prompt)
 
 
+@lru_cache
+def _get_token_encoding():
+    """Load the tiktoken encoding, or None if tiktoken or its data file is unavailable."""
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # The encoding is downloaded on first use, which fails when offline
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens in text, estimating ~4 characters per token without tiktoken."""
+    encoding = _get_token_encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode_ordinary(text))
+
+
+class TokenBudget:
+    """Running token count for assembling prompt context up to a limit."""
+
+    def __init__(self, limit: int):
+        """Initialize the budget.
+
+        Args:
+            limit: Maximum number of tokens to accept
+        """
+        self.limit = limit
+        self.used = 0
+
+    def add(self, text: str) -> bool:
+        """Reserve tokens for text, returning False (and reserving nothing) if it won't fit."""
+        tokens = count_tokens(text)
+        if self.used + tokens > self.limit:
+            return False
+        self.used += tokens
+        return True
+
+
+class StructuredStream:
+    """Structured output that streams the JSON response and reports list items early.
+
+    Drop-in replacement for ``llm.with_structured_output(schema)``: ``ainvoke``
+    still returns a validated ``schema`` instance, but each item of
+    ``items_field`` is validated and handed to ``on_item`` as soon as its JSON
+    object is complete, instead of after the whole (often 10K+ token) response.
+    """
+
+    streams_items = True
+
+    def __init__(self, llm, schema, items_field: str):
+        """Initialize the streaming structured output.
+
+        Args:
+            llm: LangChain chat model
+            schema: Pydantic model describing the full response
+            items_field: Name of the list field on ``schema`` to stream
+        """
+        self.schema = schema
+        self.items_field = items_field
+        self.item_schema = typing.get_args(schema.model_fields[items_field].annotation)[0]
+        self.llm = llm.bind(
+            response_format={
+                "type": "json_schema",
+                "json_schema": {"name": schema.__name__, "schema": schema.model_json_schema()},
+            }
+        )
+
+    async def ainvoke(self, messages, on_item: Callable | None = None):
+        """Stream the response, calling ``on_item`` for each completed list item."""
+        parser = JsonItemStream(self.items_field)
+        parts = []
+        async for chunk in self.llm.astream(messages):
+            text = chunk.content if isinstance(chunk.content, str) else ""
+            parts.append(text)
+            if on_item:
+                for item in parser.feed(text):
+                    on_item(self.item_schema.model_validate(item))
+        return self.schema.model_validate_json("".join(parts))
+
+    def invoke(self, messages):
+        """Blocking invocation without streaming."""
+        response = self.llm.invoke(messages)
+        return self.schema.model_validate_json(response.content)
+
+
+class JsonTextStream:
+    """Raw-text executor that stops reading once the JSON object in the response is complete.
+
+    For prompts that ask for "JSON only": the response is streamed through
+    ``JsonObjectStream`` and ``ainvoke`` returns an ``AIMessage`` holding just
+    the object, without waiting for a trailing fence or commentary. If no
+    complete object arrives, the full text is returned for the caller to report.
+    """
+
+    def __init__(self, llm):
+        """Initialize the streaming executor.
+
+        Args:
+            llm: LangChain chat model
+        """
+        self.llm = llm
+
+    async def ainvoke(self, messages):
+        """Stream the response until its top-level JSON object closes."""
+        from langchain_core.messages import AIMessage
+
+        parser = JsonObjectStream()
+        parts = []
+        stream = self.llm.astream(messages)
+        try:
+            async for chunk in stream:
+                text = chunk.content if isinstance(chunk.content, str) else ""
+                parts.append(text)
+                payload = parser.feed(text)
+                if payload is not None:
+                    return AIMessage(content=payload)
+        finally:
+            await stream.aclose()
+        return AIMessage(content="".join(parts))
+
+    def invoke(self, messages):
+        """Blocking invocation without streaming."""
+        return self.llm.invoke(messages)
+
+
 class MockLLM:
     """Mock LLM for testing without API calls."""
 
@@ -60,3 +247,10 @@ class MockLLM:
 
     async def ainvoke(self, messages):
         return self.invoke(messages)
+
+    async def astream(self, messages):
+        from langchain_core.messages import AIMessageChunk
+
+        content = self.invoke(messages).content
+        for start in range(0, len(content), 16):
+            yield AIMessageChunk(content=content[start : start + 16])
@@ -0,0 +1,86 @@
+"""Apply unified diff patches produced by the Debugger agent."""
+
+import re
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,\d+)? \+\d+(?:,\d+)? @@")
+
+
+class PatchError(ValueError):
+    """Raised when a unified diff cannot be parsed or applied."""
+
+
+def _parse_hunks(diff: str) -> list[tuple[int, list[str], list[str]]]:
+    """Parse a single-file unified diff into (old_start, old_lines, new_lines) hunks."""
+    hunks = []
+    old: list[str] = []
+    new: list[str] = []
+    for line in diff.splitlines():
+        if line.startswith("@@"):
+            match = _HUNK_HEADER.match(line)
+            if not match:
+                raise PatchError(f"Malformed hunk header: {line}")
+            old, new = [], []
+            hunks.append((int(match.group(1)), old, new))
+        elif not hunks or line.startswith("\\"):
+            # File headers (---/+++) before the first hunk, "\ No newline at end of file"
+            continue
+        elif line.startswith("-"):
+            old.append(line[1:])
+        elif line.startswith("+"):
+            new.append(line[1:])
+        elif line.startswith(" ") or not line:
+            # LLMs often drop the leading space on blank context lines
+            old.append(line[1:])
+            new.append(line[1:])
+        else:
+            raise PatchError(f"Unexpected line in hunk: {line}")
+
+    if not hunks:
+        raise PatchError("No hunks found in diff")
+    return hunks
+
+
+def _locate(lines: list[str], old: list[str], expected: int) -> int:
+    """Find where the hunk's old lines occur, preferring the position the header gives.
+
+    Line numbers from the LLM are frequently off by a few lines, so the context
+    is searched outward from the expected position and matched ignoring
+    trailing whitespace.
+    """
+    target = [line.rstrip() for line in old]
+    size = len(target)
+    last = len(lines) - size
+    expected = min(max(expected, 0), max(last, 0))
+
+    for distance in range(max(expected, last - expected) + 1):
+        for position in (expected - distance, expected + distance):
+            if (
+                0 <= position <= last
+                and [line.rstrip() for line in lines[position : position + size]] == target
+            ):
+                return position
+    raise PatchError(f"Hunk context not found near line {expected + 1}")
+
+
+def apply_unified_diff(original: str, diff: str) -> str:
+    """Apply a single-file unified diff to original and return the new content.
+
+    Raises:
+        PatchError: If the diff is malformed or its context doesn't match original
+    """
+    lines = original.splitlines()
+    offset = 0
+    for old_start, old, new in _parse_hunks(diff):
+        # "-N,M" starts at line N; a pure insertion "-N,0" goes after line N
+        start = old_start - 1 if old else old_start
+        if old:
+            position = _locate(lines, old, start + offset)
+        else:
+            position = min(max(start + offset, 0), len(lines))
+        lines[position : position + len(old)] = new
+        offset = position - start + len(new) - len(old)
+
+    content = "\n".join(lines)
+    if original.endswith("\n") or not original:
+        content += "\n"
+    return content
@@ -1,3 +1,4 @@
+import asyncio
 import re
 from pathlib import Path
 
@@ -10,14 +11,15 @@ class StaticValidator:
     Runs non-LLM checks: rustfmt, cargo check, etc.
     """
 
-    def __init__(self, project_path: Path):
+    def __init__(self, project_path: Path, builder: Builder | None = None):
         """Initialize with project path.
 
         Args:
             project_path: Path to the project directory
+            builder: Builder to run checks with, shared with the build step if given
         """
         self.project_path = Path(project_path)
-        self.builder = Builder(project_path)
+        self.builder = builder or Builder(project_path)
         self.errors: list[str] = []
 
     def validate_rust_syntax(self, files: dict) -> bool:
@@ -134,8 +136,9 @@ class StaticValidator:
                 "logs": "",
             }
 
-        # Run cargo check for actual compilation verification
-        success, output = self.run_cargo_check()
+        # Run cargo check for actual compilation verification, off the event loop so a
+        # build started alongside it keeps running and draining its output
+        success, output = await asyncio.to_thread(self.run_cargo_check)
 
         if not success:
             # Parse and filter useful error messages
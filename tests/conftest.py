@@ -0,0 +1,17 @@
+"""Shared fixtures: keep tests offline and out of the user's caches and logs."""
+
+import pytest
+
+from src.config import get_settings
+
+
+@pytest.fixture(autouse=True)
+def isolated_env(tmp_path, monkeypatch):
+    # Agents build a ChatOpenAI client on init, which needs some key; no request is sent
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+    monkeypatch.setenv("LLM_CACHE", "0")
+    # log_llm_call writes to ./logs
+    monkeypatch.chdir(tmp_path)
+    get_settings.cache_clear()
+    yield
+    get_settings.cache_clear()
@@ -0,0 +1,176 @@
+"""Tests for Builder's build skipping, offline cargo runs and streamed builds."""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+from src.utils.builder import DEPS_MARKER, Builder
+
+BUILT_AT = 1_700_000_000
+
+
+def _touch(path, mtime: int) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("")
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def project(tmp_path):
+    """An Anchor project whose artifact is newer than every build input."""
+    for name in ("Anchor.toml", "Cargo.toml", "Cargo.lock"):
+        _touch(tmp_path / name, BUILT_AT - 10)
+    for name in ("src/lib.rs", "src/instructions/mint.rs", "Cargo.toml", "Xargo.toml"):
+        _touch(tmp_path / "programs" / "vault" / name, BUILT_AT - 10)
+    _touch(tmp_path / "target" / "deploy" / "vault.so", BUILT_AT)
+    return tmp_path
+
+
+def test_artifact_newer_than_inputs_is_fresh(project):
+    builder = Builder(project)
+    assert not builder._sources_newer_than(project / "target" / "deploy" / "vault.so")
+
+
+@pytest.mark.parametrize(
+    "changed",
+    [
+        "Anchor.toml",
+        "Cargo.toml",
+        "Cargo.lock",
+        "programs/vault/src/instructions/mint.rs",
+        "programs/vault/Cargo.toml",
+        "programs/vault/Xargo.toml",
+    ],
+)
+def test_newer_build_input_makes_artifact_stale(project, changed):
+    _touch(project / changed, BUILT_AT + 10)
+    assert Builder(project)._sources_newer_than(project / "target" / "deploy" / "vault.so")
+
+
+@pytest.mark.parametrize("changed", ["README.md", "tests/vault.ts", "programs/vault/notes.md"])
+def test_other_files_do_not_make_artifact_stale(project, changed):
+    _touch(project / changed, BUILT_AT + 10)
+    assert not Builder(project)._sources_newer_than(project / "target" / "deploy" / "vault.so")
+
+
+def test_averify_build_skips_up_to_date_artifact(project, monkeypatch):
+    builder = Builder(project)
+
+    async def fail(*args, **kwargs):
+        raise AssertionError("anchor build should have been skipped")
+
+    monkeypatch.setattr(builder, "_astream_command", fail)
+    success, output = asyncio.run(builder.averify_build())
+    assert success
+    assert output.startswith("Build skipped (up-to-date)")
+
+
+def test_averify_build_runs_anchor_when_sources_changed(project, monkeypatch):
+    _touch(project / "programs" / "vault" / "src" / "lib.rs", BUILT_AT + 10)
+    builder = Builder(project)
+    commands = []
+
+    async def build(cmd, on_event=None):
+        commands.append(cmd)
+        return True, ""
+
+    monkeypatch.setattr(builder, "_astream_command", build)
+    success, output = asyncio.run(builder.averify_build())
+    assert success
+    assert commands == [["anchor", "build"]]
+    assert output.startswith("Build successful")
+
+
+class ScriptedCommands:
+    """run_command stub returning queued (success, stdout, stderr) results in order."""
+
+    def __init__(self, *results: tuple[bool, str, str]):
+        self.results = list(results)
+        self.commands: list[list[str]] = []
+
+    def __call__(self, cmd, capture_output=False, **kwargs):
+        self.commands.append(cmd)
+        return self.results.pop(0)
+
+
+@pytest.fixture
+def fetched_project(tmp_path):
+    """A project whose locked dependencies were fetched by an earlier online run."""
+    (tmp_path / "Cargo.lock").write_text("")
+    (tmp_path / DEPS_MARKER).write_text("")
+    return tmp_path
+
+
+def test_run_cargo_offline_success(fetched_project, monkeypatch):
+    builder = Builder(fetched_project)
+    commands = ScriptedCommands((True, "Finished", ""))
+    monkeypatch.setattr(builder, "run_command", commands)
+
+    assert builder._run_cargo(["build-sbf"]) == (True, "Finished")
+    assert commands.commands == [["cargo", "build-sbf", "--frozen", "--offline"]]
+    assert (fetched_project / DEPS_MARKER).exists()
+
+
+def test_run_cargo_compile_error_does_not_retry_online(fetched_project, monkeypatch):
+    builder = Builder(fetched_project)
+    commands = ScriptedCommands((False, "", "error[E0425]: cannot find value `x` in this scope"))
+    monkeypatch.setattr(builder, "run_command", commands)
+
+    success, output = builder._run_cargo(["build-sbf"])
+    assert not success
+    assert "E0425" in output
+    assert len(commands.commands) == 1
+    assert (fetched_project / DEPS_MARKER).exists()
+
+
+def test_run_cargo_missing_dependency_retries_online(fetched_project, monkeypatch):
+    builder = Builder(fetched_project)
+    commands = ScriptedCommands(
+        (False, "", "error: no matching package named `anchor-spl` found"),
+        (False, "", "error: failed to get `anchor-spl` as a dependency"),
+    )
+    monkeypatch.setattr(builder, "run_command", commands)
+
+    success, output = builder._run_cargo(["build-sbf"])
+    assert not success
+    assert output == "error: failed to get `anchor-spl` as a dependency"
+    assert commands.commands == [
+        ["cargo", "build-sbf", "--frozen", "--offline"],
+        ["cargo", "build-sbf"],
+    ]
+    assert not (fetched_project / DEPS_MARKER).exists()
+
+
+def _python(code: str) -> list[str]:
+    return [sys.executable, "-c", code]
+
+
+def test_astream_command_handles_lines_longer_than_the_reader_limit(tmp_path):
+    events = []
+    code = "print('x' * 200_000); print('done', end='')"
+    success, output = asyncio.run(Builder(tmp_path)._astream_command(_python(code), events.append))
+
+    assert success
+    assert events == ["build:log:" + "x" * 200_000, "build:log:done"]
+    assert output == "x" * 200_000 + "\ndone"
+
+
+def test_astream_command_kills_the_process_when_a_callback_raises(tmp_path, monkeypatch):
+    processes = []
+    create = asyncio.create_subprocess_exec
+
+    async def spawn(*args, **kwargs):
+        processes.append(await create(*args, **kwargs))
+        return processes[-1]
+
+    monkeypatch.setattr(asyncio, "create_subprocess_exec", spawn)
+
+    def on_event(event):
+        raise RuntimeError("display failed")
+
+    code = "import time; print('start', flush=True); time.sleep(30)"
+    with pytest.raises(RuntimeError):
+        asyncio.run(Builder(tmp_path)._astream_command(_python(code), on_event))
+    assert processes[0].returncode is not None
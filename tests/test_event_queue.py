@@ -0,0 +1,40 @@
+"""Tests for non-blocking event delivery."""
+
+import asyncio
+
+from src.utils.event_queue import EventQueue
+
+
+def _emit(events: list[str], maxsize: int) -> list[str]:
+    """Queue events on a size-limited EventQueue, then return what was delivered."""
+    delivered: list[str] = []
+
+    async def run():
+        queue = EventQueue(delivered.append, maxsize=maxsize)
+        for event in events:
+            queue(event)
+        queue.start()
+        await queue.aclose()
+
+    asyncio.run(run())
+    return delivered
+
+
+def test_events_are_delivered_in_order():
+    events = ["agent:Code Generator:start", "file:streamed:a.rs:10", "build:success"]
+    assert _emit(events, maxsize=10) == events
+
+
+def test_overflow_drops_new_progress_events():
+    events = ["build:start", "build:log:one", "build:log:two"]
+    assert _emit(events, maxsize=2) == ["build:start", "build:log:one"]
+
+
+def test_overflow_evicts_a_progress_event_for_a_lifecycle_event():
+    events = ["build:start", "file:streamed:a.rs:10", "batch:failed:b", "build:failed"]
+    assert _emit(events, maxsize=3) == ["build:start", "batch:failed:b", "build:failed"]
+
+
+def test_overflow_never_drops_lifecycle_events():
+    events = ["build:start", "batch:failed:b", "build:failed", "workflow:failed"]
+    assert _emit(events, maxsize=2) == events
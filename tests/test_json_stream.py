@@ -0,0 +1,108 @@
+"""Tests for the incremental JSON parsers used on streamed LLM output."""
+
+import asyncio
+
+from langchain_core.messages import AIMessageChunk
+
+from src.utils.json_stream import JsonItemStream, JsonObjectStream
+from src.utils.llm_utils import JsonTextStream
+
+
+def _feed_all(parser, chunks: list[str]):
+    """Feed chunks in order, returning the first non-None result."""
+    for chunk in chunks:
+        result = parser.feed(chunk)
+        if result is not None:
+            return result
+    return None
+
+
+class ChunkedLLM:
+    """Chat model stub that streams fixed chunks and counts the chunks it sent."""
+
+    def __init__(self, chunks: list[str]):
+        self.chunks = chunks
+        self.sent = 0
+
+    async def astream(self, messages):
+        for chunk in self.chunks:
+            self.sent += 1
+            yield AIMessageChunk(content=chunk)
+
+
+def test_object_stream_skips_braces_in_prose():
+    chunks = ["Here is {the} spec: ", '{"name": "Vault"}', " and more {text}"]
+    assert _feed_all(JsonObjectStream(), chunks) == '{"name": "Vault"}'
+
+
+def test_object_stream_ignores_braces_inside_strings():
+    chunks = ['{"description": "uses { and } and \\"}\\" ', 'freely", "n": 1}']
+    result = _feed_all(JsonObjectStream(), chunks)
+    assert result == '{"description": "uses { and } and \\"}\\" freely", "n": 1}'
+
+
+def test_object_stream_unwraps_fenced_reply():
+    chunks = ["```json\n{", '"name": "Counter"', "}\n```\nDone."]
+    assert _feed_all(JsonObjectStream(), chunks) == '{"name": "Counter"}'
+
+
+def test_object_stream_waits_for_incomplete_object():
+    parser = JsonObjectStream()
+    assert parser.feed('{"name": "Vau') is None
+    assert parser.feed('lt"}') == '{"name": "Vault"}'
+
+
+def test_text_stream_reads_past_prose_braces():
+    llm = ChunkedLLM(["Here is {the} spec: ", '{"name": "Vault"}', "trailing", "more"])
+    response = asyncio.run(JsonTextStream(llm).ainvoke([]))
+    assert response.content == '{"name": "Vault"}'
+    assert llm.sent == 2
+
+
+def _items(chunks: list[str], field: str = "files") -> list[list[dict]]:
+    """Feed chunks to a JsonItemStream and return the items each one completed."""
+    parser = JsonItemStream(field)
+    return [parser.feed(chunk) for chunk in chunks]
+
+
+def test_item_stream_emits_each_item_when_it_closes():
+    chunks = [
+        '{"files": [{"path": "a.rs", ',
+        '"content": "x"}, {"pa',
+        'th": "b.rs", "content": "y"}]}',
+    ]
+    assert _items(chunks) == [
+        [],
+        [{"path": "a.rs", "content": "x"}],
+        [{"path": "b.rs", "content": "y"}],
+    ]
+
+
+def test_item_stream_splits_anywhere_including_inside_the_field_name():
+    text = '{"analysis": "ok", "files": [{"path": "a.rs", "content": "x"}]}'
+    chunks = [text[i : i + 3] for i in range(0, len(text), 3)]
+    emitted = [item for items in _items(chunks) for item in items]
+    assert emitted == [{"path": "a.rs", "content": "x"}]
+
+
+def test_item_stream_handles_escaped_quotes():
+    chunks = ['{"files": [{"path": "a.rs", "content": "msg!(\\"hi', '\\");"}]}']
+    emitted = [item for items in _items(chunks) for item in items]
+    assert emitted == [{"path": "a.rs", "content": 'msg!("hi");'}]
+
+
+def test_item_stream_ignores_brackets_and_braces_in_strings():
+    content = "fn f() -> [u8; 2] { [0, 1] } }]"
+    text = (
+        '{"files": [{"path": "a.rs", "content": "'
+        + content
+        + '"}, {"path": "b.rs", "content": ""}]}'
+    )
+    emitted = [item for items in _items([text[:30], text[30:]]) for item in items]
+    assert emitted == [{"path": "a.rs", "content": content}, {"path": "b.rs", "content": ""}]
+
+
+def test_item_stream_ignores_other_arrays():
+    text = '{"notes": [{"path": "x"}], "files": [{"path": "a.rs", "content": "x"}]}'
+    emitted = [item for items in _items([text]) for item in items]
+    assert emitted == [{"path": "a.rs", "content": "x"}]
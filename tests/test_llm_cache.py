@@ -0,0 +1,65 @@
+"""Tests for which LLM responses the on-disk cache keeps."""
+
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from src.agents import spec_interpreter
+from src.agents.spec_interpreter import SpecInterpreter
+from src.utils import llm_cache
+from src.utils.llm_cache import CachedRunnable, LLMCache
+
+
+class StaticReply:
+    """Executor stub that answers every request with the same text."""
+
+    def __init__(self, content: str):
+        self.content = content
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        return AIMessage(content=self.content)
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = LLMCache(tmp_path / "llm.db")
+    monkeypatch.setattr(llm_cache, "get_llm_cache", lambda: cache)
+    monkeypatch.setattr(spec_interpreter, "_response_cache", spec_interpreter.OrderedDict())
+    return cache
+
+
+def _interpreter(reply: StaticReply) -> SpecInterpreter:
+    agent = SpecInterpreter(test_mode=True)
+    agent.executor = CachedRunnable(
+        reply, model=agent.model_name, namespace=agent.agent_name, enabled=True
+    )
+    return agent
+
+
+def _stored(cache: LLMCache) -> int:
+    return cache._connect().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+def test_malformed_spec_reply_is_not_cached(cache):
+    reply = StaticReply('{"name": "Broken", "description": ')
+    agent = _interpreter(reply)
+
+    for _ in range(2):
+        state = asyncio.run(agent.run({"user_spec": "make a vault"}))
+        assert state["error_message"].startswith("Failed to parse spec interpretation")
+
+    assert _stored(cache) == 0
+    assert reply.calls == 2
+
+
+def test_valid_spec_reply_is_cached(cache):
+    reply = StaticReply('{"name": "Vault", "description": "Holds deposits"}')
+    agent = _interpreter(reply)
+
+    state = asyncio.run(agent.run({"user_spec": "make a vault"}))
+
+    assert state["project_name"] == "vault"
+    assert _stored(cache) == 1
@@ -0,0 +1,101 @@
+"""Tests for applying the Debugger's unified diff patches."""
+
+import asyncio
+
+import pytest
+
+from src.agents.debugger import Debugger
+from src.schemas.models import DebuggerOutput, DebuggerPatch, ProjectFile
+from src.utils.unified_diff import PatchError, apply_unified_diff
+
+SOURCE = "\n".join(f"line {n}" for n in range(1, 21)) + "\n"
+
+
+def test_clean_apply():
+    diff = "--- a/lib.rs\n+++ b/lib.rs\n@@ -2,3 +2,3 @@\n line 2\n-line 3\n+line three\n line 4\n"
+    result = apply_unified_diff(SOURCE, diff)
+    assert result.splitlines()[1:4] == ["line 2", "line three", "line 4"]
+    assert result.endswith("\n")
+
+
+def test_hunk_with_wrong_line_numbers_is_found_nearby():
+    # The header says line 2, the context is really at line 10
+    diff = "@@ -2,3 +2,3 @@\n line 10\n-line 11\n+line eleven\n line 12\n"
+    result = apply_unified_diff(SOURCE, diff).splitlines()
+    assert result[10] == "line eleven"
+    assert result[1] == "line 2"
+
+
+def test_context_matches_ignoring_trailing_whitespace():
+    original = "fn main() {   \n    let x = 1;\n}\n"
+    diff = "@@ -1,3 +1,3 @@\n fn main() {\n-    let x = 1;\n+    let x = 2;\n }\n"
+    # The matched region is replaced by the hunk's lines, context included
+    assert apply_unified_diff(original, diff) == "fn main() {\n    let x = 2;\n}\n"
+
+
+def test_removed_line_starting_with_double_dash():
+    original = "-- comment\nkeep\n"
+    diff = "--- a/schema.sql\n+++ b/schema.sql\n@@ -1,2 +1,1 @@\n--- comment\n keep\n"
+    assert apply_unified_diff(original, diff) == "keep\n"
+
+
+def test_later_hunks_account_for_earlier_line_count_changes():
+    diff = (
+        "@@ -2,2 +2,4 @@\n line 2\n+added a\n+added b\n line 3\n"
+        "@@ -8,3 +10,2 @@\n line 8\n-line 9\n line 10\n"
+        "@@ -15,1 +16,1 @@\n-line 15\n+line fifteen\n"
+    )
+    result = apply_unified_diff(SOURCE, diff).splitlines()
+    assert result[:5] == ["line 1", "line 2", "added a", "added b", "line 3"]
+    assert "line 9" not in result
+    assert result[result.index("line 14") + 1] == "line fifteen"
+    assert len(result) == 21
+
+
+def test_mismatched_context_raises():
+    diff = "@@ -2,2 +2,2 @@\n not in file\n-line 3\n+line three\n"
+    with pytest.raises(PatchError):
+        apply_unified_diff(SOURCE, diff)
+
+
+def test_malformed_diff_raises():
+    with pytest.raises(PatchError):
+        apply_unified_diff(SOURCE, "just prose, no hunks")
+
+
+class StaticExecutor:
+    """Structured executor stub that always returns the same result."""
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+    async def ainvoke(self, messages, **kwargs):
+        self.calls += 1
+        return self.result
+
+
+def test_failed_patch_falls_back_to_regenerating_the_file():
+    path = "programs/vault/src/lib.rs"
+    debugger = Debugger()
+    debugger.executor = StaticExecutor(
+        DebuggerOutput(
+            patches=[DebuggerPatch(path=path, unified_diff="@@ -1,1 +1,1 @@\n-missing\n+fixed\n")],
+            analysis="typo",
+        )
+    )
+    debugger.regenerator = StaticExecutor(ProjectFile(path=path, content="regenerated\n"))
+
+    state = asyncio.run(
+        debugger.run(
+            {
+                "files": {path: "use anchor_lang::prelude::*;\nfn broken( {\n"},
+                "validation_errors": [f"{path}: Mismatched parentheses"],
+            }
+        )
+    )
+
+    assert debugger.regenerator.calls == 1
+    assert state["files"][path] == "regenerated\n"
+    assert state["current_step"] == "static_validator"
+    assert "debugger_failed_patches" not in state
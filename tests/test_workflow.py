@@ -0,0 +1,67 @@
+"""Tests for batch retries and routing in the generation workflow."""
+
+import asyncio
+
+from src.agents.code_generator import CodeGenerator
+from src.graph import workflow
+from src.schemas.models import MAX_BATCH_ATTEMPTS, GraphState
+
+
+class FlakyCodeGenerator:
+    """CodeGenerator stub that writes batch "a" and always fails on batch "b"."""
+
+    def __init__(self):
+        self.batches: list[dict] = []
+
+    async def run(self, state: dict) -> dict:
+        batch = state["current_batch"]
+        self.batches.append(batch)
+        if batch["batch_id"] == "b":
+            raise RuntimeError("rate limited")
+        state.update(files={**state["files"], "a.rs": "// a"}, current_step="static_validator")
+        return state
+
+
+def _plan_state() -> GraphState:
+    return GraphState(
+        user_spec="make a vault",
+        generation_plan={
+            "batches": [
+                {"batch_id": "a", "file_paths": ["a.rs"], "dependencies": []},
+                {"batch_id": "b", "file_paths": ["b.rs"], "dependencies": []},
+            ],
+            "generation_order": [["a", "b"]],
+        },
+        pending_files={"a.rs": "", "b.rs": ""},
+        file_progress=(0, 2),
+    )
+
+
+def test_failing_batch_is_retried_then_aborts(monkeypatch):
+    agent = FlakyCodeGenerator()
+    monkeypatch.setattr(workflow, "_get_agent", lambda agent_class, **kwargs: agent)
+
+    state = _plan_state()
+    routes = []
+    for _ in range(MAX_BATCH_ATTEMPTS + 1):
+        state = asyncio.run(workflow.batch_processor_node(state))
+        routes.append(workflow.has_more_batches(state))
+        if routes[-1] != "continue":
+            break
+
+    # The sibling's files survive the failure and it isn't generated again
+    assert state.generated_files == {"a.rs": "// a"}
+    assert state.files["a.rs"] == "// a"
+    assert [b["batch_id"] for b in agent.batches].count("a") == 1
+    assert "b.rs" in state.pending_files
+
+    # Batch b is retried with its failure count, which bypasses the LLM cache
+    attempts = [b["attempt"] for b in agent.batches if b["batch_id"] == "b"]
+    assert attempts == list(range(MAX_BATCH_ATTEMPTS))
+    generator = CodeGenerator()
+    assert not generator._bypass_cache({"current_batch": {"batch_id": "b", "attempt": 0}})
+    assert generator._bypass_cache({"current_batch": {"batch_id": "b", "attempt": 1}})
+
+    assert routes == ["continue"] * (MAX_BATCH_ATTEMPTS - 1) + ["abort"]
+    assert state.batch_attempts == {"b": MAX_BATCH_ATTEMPTS}
+    assert "Batch b failed after 3 attempts: rate limited" in state.error_message